@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 import os
+import tempfile
 
 from pathlib import Path
 
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'user',
     'blog',
@@ -54,6 +56,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,6 +103,28 @@ DATABASES = {
 }
 
 
+# Caches
+# The 'api' cache holds rendered blog API responses. It is file based so
+# that every uwsgi worker shares the same entries and invalidations.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'API_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'api-cache'),
+        ),
+        'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('API_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -142,8 +169,86 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Post visits are buffered per worker and written back after this many
+# seconds or pending visits, whichever comes first. The threshold bounds
+# how many visits a crashed worker can lose. BLOG_COUNT_VISITS=0 stops
+# counting visits; the test runner does so.
+BLOG_COUNT_VISITS = bool(int(os.environ.get('BLOG_COUNT_VISITS', 1)))
+BLOG_VISIT_FLUSH_INTERVAL = float(
+    os.environ.get('BLOG_VISIT_FLUSH_INTERVAL', 10)
+)
+BLOG_VISIT_FLUSH_THRESHOLD = int(
+    os.environ.get('BLOG_VISIT_FLUSH_THRESHOLD', 100)
+)
+
+# Share of requests timed by ServerTimingMiddleware, from 0 to 1. Rates
+# for single routes are given by URL name, as in
+# SERVER_TIMING_ROUTES=blog:blog-list=1,user:token=0
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.environ.get('SERVER_TIMING_SAMPLE_RATE', 0)
+)
+SERVER_TIMING_ROUTES = {
+    route: float(rate)
+    for route, _, rate in (
+        item.rpartition('=')
+        for item in os.environ.get('SERVER_TIMING_ROUTES', '').split(',')
+        if item
+    )
+}
+
+# Every worker counts its requests in its own mmap'd file in METRICS_DIR,
+# and /metrics sums the files. When METRICS_TOKEN is set, /metrics asks
+# for it as a bearer token.
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'api-metrics'),
+)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Queries at least SLOW_QUERY_MS long are logged to core.slowlog, and so
+# are queries repeated SLOW_QUERY_REPEAT times in a request. Unset, the
+# slow query log is off.
+SLOW_QUERY_MS = (
+    float(os.environ['SLOW_QUERY_MS'])
+    if 'SLOW_QUERY_MS' in os.environ else None
+)
+SLOW_QUERY_REPEAT = int(os.environ.get('SLOW_QUERY_REPEAT', 10))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.slowlog': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def clear_response_cache(sender, **kwargs):
+    """Drop cached responses, whose shape may change with the schema."""
+    from blog.cache import get_cache
+    get_cache().clear()
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from blog import signals  # noqa: F401
+        post_migrate.connect(clear_response_cache, sender=self)
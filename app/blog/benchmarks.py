@@ -0,0 +1,186 @@
+"""
+Micro-benchmarks for the blog APIs, run with `manage.py benchmark`
+"""
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Prefetch
+from django.db.models.signals import m2m_changed
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import (
+    Blog,
+    Section,
+    Tag,
+)
+from core.renderers import FastJSONRenderer
+from blog.fastpath import ValuesSerializer
+from blog.serializers import BlogSerializer
+
+
+CASES = {}
+
+
+def benchmark(name):
+    """Register a benchmark case under `name`."""
+    def decorator(func):
+        CASES[name] = func
+        return func
+
+    return decorator
+
+
+def measure(func, repeat):
+    """Run `func` `repeat` times, returning the mean time and query count."""
+    elapsed = 0.0
+    queries = 0
+    for i in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            func(i)
+            elapsed += time.perf_counter() - start
+        queries += len(captured)
+
+    return {
+        'ms_per_run': round(elapsed / repeat * 1000, 3),
+        'queries_per_run': queries / repeat,
+    }
+
+
+def _user(email):
+    return get_user_model().objects.create_user(email, 'benchpass123')
+
+
+@benchmark('m2m_sync')
+def m2m_sync(size, repeat):
+    """Update a post with `size` sections, swapping one of them per run.
+
+    Compares the old clear-and-re-add update against the diff-based sync
+    BlogSerializer.update now performs.
+    """
+    user = _user('bench-m2m@example.com')
+    post = Blog.objects.create(user=user, title='bench')
+    sections = Section.objects.bulk_create(
+        Section(user=user, header=f'header {i}', description='')
+        for i in range(size)
+    )
+    post.sections.add(*sections)
+    serializer = BlogSerializer(context={
+        'request': SimpleNamespace(user=user, query_params={}),
+    })
+
+    def payload(i):
+        # the first section alternates, the rest stay linked
+        return [{'header': f'swap {i % 2}', 'description': ''}] + [
+            {'header': f'header {n}', 'description': ''}
+            for n in range(1, size)
+        ]
+
+    written = []
+
+    def count_links(sender, action, pk_set, **kwargs):
+        if action == 'pre_clear':
+            written.append(post.sections.count())
+        elif action in ('post_add', 'post_remove'):
+            written.append(len(pk_set))
+
+    def clear_and_add(i):
+        post.sections.clear()
+        serializer._get_or_create_sections(payload(i), post)
+
+    def diff(i):
+        serializer._sync_links(
+            post.sections,
+            serializer._bulk_get_or_create(Section, payload(i)),
+        )
+
+    results = {}
+    m2m_changed.connect(count_links, sender=Blog.sections.through)
+    try:
+        for name, func in [('clear_and_add', clear_and_add), ('diff', diff)]:
+            written.clear()
+            results[name] = measure(func, repeat)
+            results[name]['links_written_per_run'] = sum(written) / repeat
+    finally:
+        m2m_changed.disconnect(count_links, sender=Blog.sections.through)
+
+    return results
+
+
+def _posts(user, size):
+    """Create `size` posts with three tags and two sections each."""
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'tag {i}') for i in range(10)
+    )
+    sections = Section.objects.bulk_create(
+        Section(user=user, header=f'header {i}', description='text ' * 50)
+        for i in range(2 * size)
+    )
+    posts = Blog.objects.bulk_create(
+        Blog(user=user, title=f'post {i}', detail='detail ' * 20)
+        for i in range(size)
+    )
+    Blog.tags.through.objects.bulk_create(
+        Blog.tags.through(blog=post, tag=tags[(i + n) % len(tags)])
+        for i, post in enumerate(posts) for n in range(3)
+    )
+    Blog.sections.through.objects.bulk_create(
+        Blog.sections.through(blog=post, section=sections[2 * i + n])
+        for i, post in enumerate(posts) for n in range(2)
+    )
+    return Blog.objects.filter(user=user).order_by('-id')
+
+
+@benchmark('post_list')
+def post_list(size, repeat):
+    """Render `size` posts with three tags and two sections each.
+
+    Compares BlogSerializer over prefetched instances with the values()
+    rendering the list endpoint uses.
+    """
+    queryset = _posts(_user('bench-list@example.com'), size)
+
+    def model_serializer(i):
+        BlogSerializer(queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('sections', queryset=Section.objects.order_by('id')),
+        ), many=True).data
+
+    def values(i):
+        fast = ValuesSerializer(BlogSerializer())
+        fast.to_representation(fast.get_values(queryset))
+
+    results = {
+        'model_serializer': measure(model_serializer, repeat),
+        'values': measure(values, repeat),
+    }
+    for result in results.values():
+        result['rows_per_sec'] = round(size / result['ms_per_run'] * 1000)
+
+    return results
+
+
+@benchmark('json_encode')
+def json_encode(size, repeat):
+    """Encode a BlogSerializer payload of `size` posts.
+
+    Compares DRF's stdlib JSONRenderer with the orjson FastJSONRenderer.
+    """
+    queryset = _posts(_user('bench-json@example.com'), size)
+    data = BlogSerializer(queryset.prefetch_related(
+        'tags', 'sections',
+    ), many=True).data
+
+    results = {}
+    for name, renderer in [
+        ('stdlib', JSONRenderer()),
+        ('orjson', FastJSONRenderer()),
+    ]:
+        results[name] = measure(lambda i: renderer.render(data), repeat)
+        results[name]['bytes'] = len(renderer.render(data))
+
+    return results
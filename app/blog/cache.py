@@ -0,0 +1,162 @@
+"""
+Shared response cache for the blog APIs
+"""
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+from django.db import (
+    connection,
+    transaction,
+)
+
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.response import Response
+
+from core import metrics
+
+
+CACHE_ALIAS = 'api'
+
+
+def get_cache():
+    """Return the cache shared by every worker."""
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(scope):
+    return f'gen:{scope}'
+
+
+def get_generations(scopes):
+    """Return the current generation token of each scope."""
+    cache = get_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # a fresh token, so an evicted generation never resurrects
+            # entries that were cached under an older one
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            found[key] = cache.get(key)
+
+    return [found[key] for key in keys]
+
+
+def _bump(scopes):
+    get_cache().set_many(
+        {_generation_key(scope): uuid.uuid4().hex for scope in scopes},
+        timeout=None,
+    )
+
+
+def invalidate(*scopes):
+    """Evict every entry cached under the given scopes.
+
+    Inside a transaction the scopes are bumped again on commit, so a
+    response computed from the old rows meanwhile is not kept.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+
+    _bump(scopes)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def record(route, hit):
+    """Count a cache hit or miss for a route in the worker's metrics."""
+    family = 'api_cache_hits_total' if hit else 'api_cache_misses_total'
+    metrics.inc(family, {'route': route})
+
+
+def get_stats(routes):
+    """Return {route: {'hits', 'misses', 'ratio'}} over every worker."""
+    totals = metrics.collect()
+    stats = {}
+    for route in routes:
+        hits, misses = (
+            totals.get(metrics.sample_key(family, {'route': route}), 0)
+            for family in ('api_cache_hits_total', 'api_cache_misses_total')
+        )
+        total = hits + misses
+        stats[route] = {
+            'hits': hits,
+            'misses': misses,
+            'ratio': hits / total if total else 0.0,
+        }
+
+    return stats
+
+
+class CachedResponseMixin:
+    """Serve GET list/retrieve responses from the shared cache.
+
+    Entries are keyed on the user, the path and the normalized query
+    string, plus the generation of every scope the response depends on.
+    Signal handlers in blog.signals bump those generations on writes, so
+    an entry is never served after something it embeds has changed.
+    """
+
+    def get_cache_scopes(self):
+        """Return the invalidation scopes of the current response."""
+        basename = self.basename
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return [f'{basename}:{self.kwargs[lookup_url_kwarg]}']
+
+        return [f'{basename}-list:{self.request.user.pk}']
+
+    def get_cache_key(self):
+        """Return the cache key of the current request."""
+        query = urlencode(sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            for value in values
+        ))
+        scopes = self.get_cache_scopes()
+        parts = [
+            str(self.request.user.pk),
+            self.request.path,
+            query,
+            *scopes,
+            *get_generations(scopes),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+        return f'resp:{digest}'
+
+    def _cached(self, view, request, *args, **kwargs):
+        """Return the cached response data, or call the view and store it."""
+        if not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        cache = get_cache()
+        # the URL name MetricsMiddleware counts the request under
+        route = request.resolver_match.view_name
+        key = self.get_cache_key()
+        data = cache.get(key)
+        if data is not None:
+            record(route, hit=True)
+            return Response(data)
+
+        record(route, hit=False)
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        view = getattr(super(), 'retrieve', None)
+        if view is None:
+            # the viewset has detail routes but no retrieve action
+            raise MethodNotAllowed(request.method)
+
+        return self._cached(view, request, *args, **kwargs)
@@ -0,0 +1,217 @@
+"""
+Conditional GET support for the blog APIs
+"""
+import hashlib
+
+from django.db.models import (
+    Count,
+    Max,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from rest_framework.exceptions import MethodNotAllowed
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match/If-Modified-Since before any serializer runs.
+
+    A detail validator is the `updated_at` of the requested row, fetched
+    by primary key. A paginated list validator is built from the ids and
+    `updated_at` of the rows on the requested page, read with the same
+    keyset query the page uses; unpaginated lists use the row count and
+    latest `updated_at`. Adding, editing or deleting a row changes them.
+
+    Only conditional requests pay for that query up front. Others get
+    their validators from the rows loaded for the response, unless the
+    response came from the cache or a version stamp lives on a related
+    row, when the query runs after the view.
+    """
+    # version stamps whose change alters a row's representation
+    version_fields = ['updated_at']
+
+    def get_version_fields(self):
+        """Return the version stamps of the current request."""
+        return self.version_fields
+
+    def get_list_validators(self):
+        """Return (etag, last_modified) for the requested list page."""
+        fields = self.get_version_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        if paginator is None:
+            stats = queryset.order_by().aggregate(
+                count=Count('pk'),
+                **{f'v{i}': Max(field) for i, field in enumerate(fields)},
+            )
+            stamps = [stats[f'v{i}'] for i in range(len(fields))]
+            return self._make_validators([stats['count']], stamps)
+
+        # run the page query over the key and version columns only
+        keys = [field.lstrip('-') for field in paginator.ordering]
+        rows = paginator.paginate_queryset(
+            queryset.values(*keys, *fields), self.request, view=self,
+        )
+
+        return self._page_validators(rows, fields)
+
+    def _page_validators(self, rows, fields):
+        paginator = self.paginator
+        key = paginator.ordering[-1].lstrip('-')
+        stamps = [_value(row, field) for row in rows for field in fields]
+        parts = [_value(row, key) for row in rows]
+        parts += [paginator.has_next, paginator.has_previous]
+
+        return self._make_validators(parts, stamps)
+
+    def get_loaded_list_validators(self):
+        """Return the list validators from the rows the view loaded.
+
+        Returns None when the view loaded no rows or they lack a version
+        stamp.
+        """
+        fields = self.get_version_fields()
+        rows = getattr(self, '_loaded_rows', None)
+        if rows is None or any('__' in field for field in fields):
+            return None
+        rows = list(rows)
+        if rows and isinstance(rows[0], dict) and \
+                not all(field in rows[0] for field in fields):
+            return None
+        if self.paginator is not None:
+            return self._page_validators(rows, fields)
+
+        stamps = [
+            max(
+                (stamp for stamp in (_value(row, field) for row in rows)
+                 if stamp is not None),
+                default=None,
+            )
+            for field in fields
+        ]
+        return self._make_validators([len(rows)], stamps)
+
+    def get_detail_validators(self):
+        """Return (etag, last_modified) for one row, or None if missing."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().order_by().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        stamps = queryset.values_list(*self.get_version_fields()).first()
+        if stamps is None:
+            return None
+
+        return self._make_validators([], stamps)
+
+    def get_loaded_detail_validators(self):
+        """Return the detail validators from the object the view loaded."""
+        fields = self.get_version_fields()
+        instance = getattr(self, '_loaded_object', None)
+        if instance is None or any('__' in field for field in fields):
+            return None
+
+        return self._make_validators(
+            [], [getattr(instance, field) for field in fields],
+        )
+
+    def _make_validators(self, parts, stamps):
+        stamps = [stamp for stamp in stamps if stamp is not None]
+        last_modified = max(stamps) if stamps else None
+        key = '|'.join([
+            str(self.request.user.pk),
+            self.request.get_full_path(),
+            *(str(part) for part in parts),
+            *(stamp.isoformat() for stamp in stamps),
+        ])
+        etag = '"%s"' % hashlib.md5(key.encode('utf-8')).hexdigest()
+
+        return etag, last_modified
+
+    def _conditional(self, get_validators, get_loaded_validators, view,
+                     request, *args, **kwargs):
+        """Return 304 if the client copy is fresh, else call the view."""
+        if not _is_conditional(request):
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                validators = get_loaded_validators() or get_validators()
+                if validators is not None:
+                    self._set_validators(response, *validators)
+            return response
+
+        validators = get_validators()
+        if validators is None:
+            return view(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timestamp,
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._set_validators(response, etag, last_modified)
+
+        return response
+
+    @staticmethod
+    def _set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(
+                int(last_modified.timestamp()),
+            )
+
+    def get_object(self):
+        self._loaded_object = super().get_object()
+        return self._loaded_object
+
+    def paginate_queryset(self, queryset):
+        self._loaded_rows = super().paginate_queryset(queryset)
+        return self._loaded_rows
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args and \
+                getattr(self, '_loaded_rows', None) is None:
+            # an unpaginated list, evaluated as it is serialized
+            self._loaded_rows = args[0]
+        return super().get_serializer(*args, **kwargs)
+
+    def get_values_keys(self):
+        """Load the version stamps of the row itself with values() rows."""
+        return [
+            *super().get_values_keys(),
+            *(field for field in self.get_version_fields()
+              if '__' not in field),
+        ]
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(
+            self.get_list_validators, self.get_loaded_list_validators,
+            super().list, request, *args, **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        view = getattr(super(), 'retrieve', None)
+        if view is None:
+            # the viewset has detail routes but no retrieve action
+            raise MethodNotAllowed(request.method)
+
+        return self._conditional(
+            self.get_detail_validators, self.get_loaded_detail_validators,
+            view, request, *args, **kwargs,
+        )
+
+
+def _is_conditional(request):
+    return any(
+        header in request.META
+        for header in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+    )
+
+
+def _value(row, name):
+    """Return a column of a values() row or a model instance."""
+    return row[name] if isinstance(row, dict) else getattr(row, name)
@@ -0,0 +1,123 @@
+"""
+Read-only list rendering from values() rows for the blog APIs
+"""
+from collections import defaultdict
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core import timing
+
+
+class ValuesSerializer:
+    """Render what `serializer(many=True).data` would, without instances.
+
+    Scalar fields are read with one values() query and nested many
+    relations with one values_list() query each over the link table.
+    Every value goes through the same DRF field's to_representation, so
+    the output matches the model serializer for the same fields, as long
+    as both read relations ordered by id.
+    """
+
+    def __init__(self, serializer):
+        # a top level serializer instance, bound to the request context
+        self.model = serializer.Meta.model
+        self.fields = list(serializer._readable_fields)
+        self.relations = [
+            field for field in self.fields
+            if isinstance(field, serializers.ListSerializer)
+        ]
+        self.scalars = [
+            field for field in self.fields if field not in self.relations
+        ]
+
+    def get_values(self, queryset, keys=()):
+        """Return `queryset` as values() rows holding the scalar fields."""
+        sources = dict.fromkeys(
+            ['pk', *keys, *(field.source for field in self.scalars)]
+        )
+        return queryset.prefetch_related(None).values(*sources)
+
+    def _related_items(self, field, post_ids):
+        """Return {post id: [item, ...]} for one nested many relation."""
+        m2m = self.model._meta.get_field(field.source)
+        source = m2m.m2m_field_name()
+        target = m2m.m2m_reverse_field_name()
+        children = list(field.child._readable_fields)
+        rows = m2m.remote_field.through.objects.filter(
+            **{f'{source}_id__in': post_ids}
+        ).order_by(f'{target}_id').values_list(
+            f'{source}_id',
+            *(f'{target}__{child.source}' for child in children),
+        )
+
+        items = defaultdict(list)
+        for post_id, *values in rows:
+            items[post_id].append({
+                child.field_name: _represent(child, value)
+                for child, value in zip(children, values)
+            })
+
+        return items
+
+    def to_representation(self, rows):
+        """Return the list of output dicts for the given values() rows."""
+        rows = list(rows)
+        post_ids = [row['pk'] for row in rows]
+        related = {
+            field.field_name: self._related_items(field, post_ids)
+            for field in self.relations
+        } if post_ids else {}
+
+        data = []
+        with timing.phase('serialize'):
+            for row in rows:
+                item = {}
+                for field in self.fields:
+                    name = field.field_name
+                    if name in related:
+                        item[name] = related[name].get(row['pk'], [])
+                    else:
+                        item[name] = _represent(field, row[field.source])
+                data.append(item)
+
+        return data
+
+    def iter_representation(self, rows, chunk_size):
+        """Yield the output dicts of values() rows, a chunk at a time."""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield from self.to_representation(chunk)
+                chunk = []
+        if chunk:
+            yield from self.to_representation(chunk)
+
+
+def _represent(field, value):
+    return None if value is None else field.to_representation(value)
+
+
+class ValuesListMixin:
+    """Serve the list action through ValuesSerializer."""
+
+    def get_values_keys(self):
+        """Return the columns loaded besides the serializer's fields."""
+        if self.paginator is None:
+            return []
+
+        return [field.lstrip('-') for field in self.paginator.ordering]
+
+    def list(self, request, *args, **kwargs):
+        serializer = ValuesSerializer(self.get_serializer())
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = serializer.get_values(queryset, self.get_values_keys())
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page),
+            )
+
+        return Response(serializer.to_representation(rows))
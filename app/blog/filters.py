@@ -0,0 +1,175 @@
+"""
+Filters for the blog post APIs
+"""
+import datetime
+
+from django.db.models import (
+    Exists,
+    OuterRef,
+)
+from django.utils.dateparse import (
+    parse_date,
+    parse_datetime,
+)
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Blog
+
+
+MAX_FILTER_IDS = 50
+BOOLEAN_VALUES = {
+    '1': True, 'true': True,
+    '0': False, 'false': False,
+}
+
+
+def _parse_ids(name, value):
+    """Convert a comma separated list of ids to integers."""
+    try:
+        ids = {int(str_id) for str_id in value.split(',') if str_id}
+    except ValueError:
+        raise ValidationError({name: ['Expected comma separated ids.']})
+    if len(ids) > MAX_FILTER_IDS:
+        raise ValidationError(
+            {name: [f'At most {MAX_FILTER_IDS} ids are allowed.']}
+        )
+
+    return ids
+
+
+def _parse_bool(name, value):
+    try:
+        return BOOLEAN_VALUES[value.lower()]
+    except KeyError:
+        raise ValidationError({name: ['Expected one of 0, 1, true, false.']})
+
+
+def _parse_moment(name, value):
+    """Parse an ISO 8601 datetime or date into an aware datetime."""
+    try:
+        moment = parse_datetime(value)
+        day = parse_date(value) if moment is None else None
+    except ValueError:
+        # well formed but out of range, like 2020-13-45
+        moment = day = None
+    if moment is None:
+        if day is None:
+            raise ValidationError({name: ['Expected an ISO 8601 date.']})
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+
+    return moment
+
+
+class PostFilterBackend(BaseFilterBackend):
+    """Compose post filters from query parameters.
+
+    Relation filters compile to EXISTS semi-joins probing the unique
+    (blog_id, tag_id) and (blog_id, section_id) link indexes, so matching
+    posts are never multiplied by a join and need no DISTINCT. Every
+    filter is ANDed with the others.
+    """
+    # query parameter -> (Blog relation, link table column)
+    relations = {
+        'tags': ('tags', 'tag_id'),
+        'sections': ('sections', 'section_id'),
+    }
+    flags = ['featured', 'visible']
+
+    def _relation_filters(self, name, ids, mode):
+        relation, column = self.relations[name]
+        links = getattr(Blog, relation).through.objects.filter(
+            blog_id=OuterRef('pk'),
+        )
+        if mode == 'all':
+            return [Exists(links.filter(**{column: pk})) for pk in ids]
+
+        return [Exists(links.filter(**{f'{column}__in': ids}))]
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        conditions = []
+        for name in self.relations:
+            value = params.get(name)
+            if not value:
+                continue
+            mode = params.get(f'{name}_mode', 'any')
+            if mode not in ('any', 'all'):
+                raise ValidationError(
+                    {f'{name}_mode': ['Expected any or all.']}
+                )
+            conditions += self._relation_filters(
+                name, _parse_ids(name, value), mode,
+            )
+
+        lookups = {}
+        for name in self.flags:
+            if params.get(name):
+                lookups[name] = _parse_bool(name, params[name])
+        if params.get('created_after'):
+            lookups['created_at__gte'] = _parse_moment(
+                'created_after', params['created_after'],
+            )
+        if params.get('created_before'):
+            lookups['created_at__lt'] = _parse_moment(
+                'created_before', params['created_before'],
+            )
+
+        return queryset.filter(*conditions, **lookups)
+
+    def get_schema_operation_parameters(self, view):
+        def parameter(name, schema, description):
+            return {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': description,
+                'schema': schema,
+            }
+
+        string = {'type': 'string'}
+        mode = {'type': 'string', 'enum': ['any', 'all']}
+        return [
+            parameter(
+                'tags', string,
+                'Comma separated list of tag IDs to filter. One indexed '
+                'EXISTS probe per post in any mode, one per tag in all mode.',
+            ),
+            parameter(
+                'tags_mode', mode,
+                'Match posts with any (default) or all of the tags.',
+            ),
+            parameter(
+                'sections', string,
+                'Comma separated list of section IDs to filter. Costs '
+                'the same as tags.',
+            ),
+            parameter(
+                'sections_mode', mode,
+                'Match posts with any (default) or all of the sections.',
+            ),
+            parameter(
+                'featured', {'type': 'boolean'},
+                'Only featured (1) or non-featured (0) posts. 1 reads the '
+                'partial featured index, 0 filters the (user, id) index.',
+            ),
+            parameter(
+                'visible', {'type': 'boolean'},
+                'Only visible (1) or hidden (0) posts. 1 reads the partial '
+                'visible index, 0 filters the (user, id) index.',
+            ),
+            parameter(
+                'created_after', {'type': 'string', 'format': 'date-time'},
+                'Posts created at or after this ISO 8601 moment. Range '
+                'scan on the (user, created_at) index.',
+            ),
+            parameter(
+                'created_before', {'type': 'string', 'format': 'date-time'},
+                'Posts created before this ISO 8601 moment. Range scan '
+                'on the (user, created_at) index.',
+            ),
+        ]
@@ -0,0 +1,306 @@
+"""
+Pagination for the blog APIs
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import (
+    BooleanField,
+    Expression,
+    F,
+    Q,
+    Value,
+)
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import (
+    remove_query_param,
+    replace_query_param,
+)
+
+
+class RowComparison(Expression):
+    """The row-value comparison `(a, b) < (x, y)`, usable in filter().
+
+    Postgres reads it as a single range on a matching composite index,
+    where the equivalent `a < x OR (a = x AND b < y)` is not.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, lhs, operator, rhs):
+        super().__init__()
+        self.lhs = list(lhs)
+        self.operator = operator
+        self.rhs = list(rhs)
+
+    def get_source_expressions(self):
+        return [*self.lhs, *self.rhs]
+
+    def set_source_expressions(self, exprs):
+        self.lhs = exprs[:len(self.lhs)]
+        self.rhs = exprs[len(self.lhs):]
+
+    def as_sql(self, compiler, connection):
+        sides = []
+        params = []
+        for side in (self.lhs, self.rhs):
+            parts = []
+            for expression in side:
+                sql, sql_params = compiler.compile(expression)
+                parts.append(sql)
+                params.extend(sql_params)
+            sides.append(f'({", ".join(parts)})')
+
+        return f'{sides[0]} {self.operator} {sides[1]}', params
+
+
+BIGINT_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _cursor_id(value):
+    """Return a cursor id, which must fit a bigint column."""
+    if isinstance(value, bool) or not isinstance(value, int) \
+            or value not in BIGINT_RANGE:
+        raise ValueError(value)
+
+    return value
+
+
+def _cursor_moment(value):
+    """Return a cursor timestamp, written by isoformat() with an offset."""
+    if not isinstance(value, str):
+        raise ValueError(value)
+    moment = parse_datetime(value)
+    if moment is None or timezone.is_naive(moment):
+        raise ValueError(value)
+
+    return moment
+
+
+def _cursor_rank(value):
+    """Return a cursor search rank."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(value)
+
+    return float(value)
+
+
+class KeysetPagination(BasePagination):
+    """Opaque cursor pagination over a unique, possibly composite ordering.
+
+    The cursor holds the ordering values of the row at the page edge, so
+    every page is one range scan on the ordering columns no matter how
+    deep it is. No OFFSET and no COUNT(*) are ever issued.
+    """
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # ordering field -> check and conversion of its value in a cursor
+    cursor_values = {
+        'id': _cursor_id,
+        'created_at': _cursor_moment,
+        'rank': _cursor_rank,
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of results, or None if disabled."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request)
+        ordering = self.get_ordering(reverse)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped at max_page_size."""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, reverse=False):
+        """Return the ordering, flipped when walking backwards."""
+        if not reverse:
+            return list(self.ordering)
+
+        return [
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        ]
+
+    def _after(self, ordering, position):
+        """Return the filter for rows after `position` in `ordering`.
+
+        Orderings in one direction compare as a row value; mixed ones
+        fall back to `a > x OR (a = x AND b > y)`.
+        """
+        descending = {field.startswith('-') for field in ordering}
+        names = [field.lstrip('-') for field in ordering]
+        if len(descending) == 1:
+            return RowComparison(
+                [F(name) for name in names],
+                '<' if descending.pop() else '>',
+                [Value(value) for value in position],
+            )
+
+        condition = Q()
+        equal = Q()
+        for field, name, value in zip(ordering, names, position):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        return condition
+
+    def _position(self, item):
+        """Return the ordering values of a model instance or values() row."""
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(item, dict):
+                value = item[name]
+            else:
+                value = getattr(item, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            position.append(value)
+
+        return position
+
+    def decode_cursor(self, request):
+        """Return (position, reverse) from the request cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            payload = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+            position = payload['p']
+            reverse = bool(payload.get('r', False))
+        except (
+            TypeError, ValueError, KeyError, UnicodeError, binascii.Error
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                self.cursor_values[field.lstrip('-')](value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, item, reverse=False):
+        """Return a URL pointing at the page after/before `item`."""
+        payload = {'p': self._position(item)}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded,
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.base_url, self.cursor_query_param,
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class PostPagination(KeysetPagination):
+    """Keyset pagination for posts, newest first."""
+    ordering = ('-id',)
+
+
+class CreatedAtPagination(KeysetPagination):
+    """Keyset pagination for comments and replies, newest first."""
+    ordering = ('-created_at', '-id')
+
+
+class SearchPagination(KeysetPagination):
+    """Keyset pagination for search results, best match first."""
+    ordering = ('-rank', '-id')
@@ -0,0 +1,109 @@
+"""
+Full-text search over blog posts
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import (
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import (
+    Cast,
+    Replace,
+)
+
+from core.models import (
+    Blog,
+    Section,
+)
+
+
+SEARCH_CONFIG = 'english'
+HIGHLIGHT_OPTIONS = {
+    'start_sel': '<mark>',
+    'stop_sel': '</mark>',
+    'config': SEARCH_CONFIG,
+}
+# same replacements as django.utils.html.escape, ampersand first
+HTML_ESCAPES = [
+    ('&', '&amp;'),
+    ('<', '&lt;'),
+    ('>', '&gt;'),
+    ('"', '&quot;'),
+    ("'", '&#x27;'),
+]
+
+
+def _section_text(field):
+    """Return the text of one section column aggregated per post."""
+    return Subquery(
+        Section.objects.filter(blog=OuterRef('pk'))
+        .order_by()
+        .values('blog')
+        .annotate(text=StringAgg(field, ' '))
+        .values('text')
+    )
+
+
+def _escaped(field):
+    """Return `field` HTML escaped in SQL, ready to highlight."""
+    expression = F(field)
+    for char, entity in HTML_ESCAPES:
+        expression = Replace(expression, Value(char), Value(entity))
+    return expression
+
+
+def search_document():
+    """Return the weighted tsvector expression of a post."""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('detail', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(_section_text('header'), weight='B',
+                       config=SEARCH_CONFIG)
+        + SearchVector(_section_text('description'), weight='C',
+                       config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(post_ids):
+    """Recompute the stored search vector of the given posts."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+
+    Blog.objects.filter(id__in=post_ids).update(
+        search_vector=search_document(),
+    )
+
+
+def search_posts(queryset, text):
+    """Filter posts matching `text`, annotated with rank and highlights.
+
+    The match is a GIN index lookup on the stored search vector. Titles
+    and details are HTML escaped before ts_headline wraps the matches in
+    <mark>, so the only markup in the highlights is the <mark> tags.
+    """
+    query = SearchQuery(
+        text, search_type='websearch', config=SEARCH_CONFIG,
+    )
+    return queryset.filter(search_vector=query).annotate(
+        # ts_rank is a float4, which does not survive a round trip
+        # through a cursor; as a double it compares exactly
+        rank=Cast(
+            SearchRank(F('search_vector'), query), FloatField(),
+        ),
+        title_highlight=SearchHeadline(
+            _escaped('title'), query, **HIGHLIGHT_OPTIONS,
+        ),
+        detail_highlight=SearchHeadline(
+            _escaped('detail'), query, **HIGHLIGHT_OPTIONS,
+        ),
+    )
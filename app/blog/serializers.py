@@ -1,7 +1,11 @@
 """
 Serializers for the blog API.
 """
+from django.db import transaction
+from django.db.models import Q
+
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
 from core.models import (
     Blog,
@@ -11,9 +15,159 @@ from core.models import (
     Reply,
     User,
 )
+from core.timing import TimedSerializerMixin
+
+
+MAX_NESTING_DEPTH = 2
+
+
+def parse_depth(request):
+    """Return the ?depth= of a request, checked against the nesting cap."""
+    value = request.query_params.get('depth', '0')
+    try:
+        depth = int(value)
+    except ValueError:
+        depth = -1
+    if not 0 <= depth <= MAX_NESTING_DEPTH:
+        raise ValidationError({'depth': [
+            f'Expected an integer from 0 to {MAX_NESTING_DEPTH}.'
+        ]})
+
+    return depth
+
+
+def _reference(name, field):
+    """Return a read-only id field standing in for a nested serializer."""
+    kwargs = {
+        'read_only': True,
+        'many': isinstance(field, serializers.ListSerializer),
+    }
+    if field.source not in (None, name):
+        kwargs['source'] = field.source
+
+    return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+class NestingMixin:
+    """Expand relations up to the context depth and cap nesting.
+
+    Relations in `depth_expansions` are embedded while the serializer is
+    nested less deep than `context['depth']`, and render as ids
+    otherwise. Below MAX_NESTING_DEPTH every nested serializer renders as
+    ids, whatever the declared fields, so no response nests deeper.
+    Every serializer in this module uses it.
+    """
+    # relation -> serializer embedding it when the depth allows
+    depth_expansions = {}
+
+    def _nesting_depth(self):
+        depth = 0
+        node = self.parent
+        while node is not None:
+            if not isinstance(node, serializers.ListSerializer):
+                depth += 1
+            node = node.parent
+
+        return depth
+
+    def get_fields(self):
+        fields = super().get_fields()
+        depth = self._nesting_depth()
+        if depth < self.context.get('depth', 0):
+            for name, serializer_class in self.depth_expansions.items():
+                fields[name] = serializer_class(read_only=True)
+        if depth >= MAX_NESTING_DEPTH:
+            for name, field in fields.items():
+                if isinstance(field, serializers.BaseSerializer):
+                    fields[name] = _reference(name, field)
+
+        return fields
+
+
+def _requested_names(request, name):
+    """Return the names listed in a comma separated query parameter."""
+    if request is None or name not in request.query_params:
+        return None
+
+    value = request.query_params[name]
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class DynamicFieldsMixin:
+    """Render only the fields a request asks for.
+
+    `?fields=` restricts the top level object to the listed fields.
+    `?expand=` lists the nested relations to embed; relations missing
+    from it are left out. Without either parameter every field renders.
+    Input fields are unaffected, so writes accept the full payload.
+    """
+    # nested relations that are only embedded on request once ?expand= is set
+    expandable_fields = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            # reject unknown names now, before a write view saves anything
+            self._rendered_names = set(self.get_rendered_fields(request))
+
+    @classmethod
+    def get_rendered_fields(cls, request):
+        """Return the names of the fields rendered for `request`."""
+        names = list(cls.Meta.fields)
+        fields = _requested_names(request, 'fields')
+        expand = _requested_names(request, 'expand')
+        expandable = [name for name in names if name in cls.expandable_fields]
+        for param, requested, allowed in (
+            ('fields', fields, names),
+            ('expand', expand, expandable),
+        ):
+            unknown = sorted((requested or set()) - set(allowed))
+            if unknown:
+                raise ValidationError({param: [
+                    f'Unknown field: {name}.' for name in unknown
+                ]})
+
+        if fields:
+            names = [name for name in names if name in fields]
+        if expand is not None:
+            names = [
+                name for name in cls.Meta.fields
+                if (name in names and name not in expandable)
+                or name in expand
+            ]
+
+        return names
+
+    def _is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    @property
+    def _readable_fields(self):
+        if not self._is_top_level():
+            yield from super()._readable_fields
+            return
+
+        if not hasattr(self, '_rendered_names'):
+            self._rendered_names = set(
+                self.get_rendered_fields(self.context.get('request'))
+            )
+        for field in super()._readable_fields:
+            if field.field_name in self._rendered_names:
+                yield field
 
 
-class UserSerializer(serializers.ModelSerializer):
+class BaseModelSerializer(TimedSerializerMixin,
+                          DynamicFieldsMixin,
+                          NestingMixin,
+                          serializers.ModelSerializer):
+    """Model serializer capped at MAX_NESTING_DEPTH, with sparse fields"""
+
+
+class UserSerializer(BaseModelSerializer):
     """Serializer for users"""
 
     class Meta:
@@ -23,10 +177,10 @@ class UserSerializer(serializers.ModelSerializer):
             'is_active', 'is_staff',
             ]
         read_only_fields = ['id', 'email']
-        write_only_fields = ['password']
+        extra_kwargs = {'password': {'write_only': True}}
 
 
-class SectionSerializer(serializers.ModelSerializer):
+class SectionSerializer(BaseModelSerializer):
     """Serializer for sections."""
 
     class Meta:
@@ -35,7 +189,7 @@ class SectionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(BaseModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -44,46 +198,95 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class BlogSerializer(serializers.ModelSerializer):
+class BlogSerializer(BaseModelSerializer):
     """Serializer for the blog model."""
+    expandable_fields = ['tags', 'sections']
     tags = TagSerializer(many=True, required=False)
     sections = SectionSerializer(many=True, required=False)
-    likes = UserSerializer(many=True, required=False)
 
     class Meta:
         model = Blog
         fields = [
                 'id', 'title', 'detail',
                 'featured', 'visit_count',
+                'like_count', 'comment_count',
                 'visible', 'created_at',
-                'tags', 'sections', 'likes',
+                'tags', 'sections',
                 ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = [
+            'id', 'created_at', 'like_count', 'comment_count',
+        ]
+
+    def _bulk_get_or_create(self, model, items):
+        """Return an object per item, creating the missing ones in bulk.
+
+        Matches like get_or_create(user=..., **item) would, but resolves
+        every item with one lookup and one bulk insert.
+        """
+        auth_user = self.context['request'].user
+        items = list({
+            tuple(sorted(item.items())): item for item in items
+        }.values())
+        if not items:
+            return []
+
+        condition = Q()
+        for item in items:
+            condition |= Q(**item)
+        existing = list(
+            model.objects.filter(condition, user=auth_user).order_by('id')
+        )
+
+        # index the matches per set of item keys, keeping the oldest row
+        indexes = {}
+        objects, missing = [], []
+        for item in items:
+            keys = tuple(sorted(item))
+            if keys not in indexes:
+                indexes[keys] = {}
+                for candidate in existing:
+                    indexes[keys].setdefault(
+                        tuple(getattr(candidate, k) for k in keys), candidate,
+                    )
+            obj = indexes[keys].get(tuple(item[k] for k in keys))
+            if obj is None:
+                obj = model(user=auth_user, **item)
+                missing.append(obj)
+            objects.append(obj)
+        model.objects.bulk_create(missing)
+
+        return objects
+
+    def _sync_links(self, manager, objects):
+        """Link exactly `objects`, touching only the links that differ."""
+        through = manager.through.objects.filter(
+            **{manager.source_field_name: manager.instance.pk}
+        )
+        current = set(through.values_list(
+            f'{manager.target_field_name}_id', flat=True,
+        ))
+        wanted = {obj.pk: obj for obj in objects}
+
+        stale = current - wanted.keys()
+        if stale:
+            manager.remove(*stale)
+        new = [obj for pk, obj in wanted.items() if pk not in current]
+        if new:
+            manager.add(*new)
 
     def _get_or_create_tags(self, tags, post):
         """Handle getting or creating tags as needed"""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            post.tags.add(tag_obj)
+        post.tags.add(*self._bulk_get_or_create(Tag, tags))
 
     def _get_or_create_sections(self, sections, post):
         """Handle getting or creating sections as needed"""
-        auth_user = self.context['request'].user
-        for section in sections:
-            section_obj, created = Section.objects.get_or_create(
-                user=auth_user,
-                **section,
-            )
-            post.sections.add(section_obj)
+        post.sections.add(*self._bulk_get_or_create(Section, sections))
 
     def _get_user(self, post):
         auth_user = self.context['request'].user
         post.likes.add(auth_user)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a blog post"""
         tags = validated_data.pop('tags', [])
@@ -94,16 +297,19 @@ class BlogSerializer(serializers.ModelSerializer):
 
         return post
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a post"""
         tags = validated_data.pop('tags', None)
         sections = validated_data.pop('sections', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._sync_links(
+                instance.tags, self._bulk_get_or_create(Tag, tags),
+            )
         if sections is not None:
-            instance.sections.clear()
-            self._get_or_create_sections(sections, instance)
+            self._sync_links(
+                instance.sections, self._bulk_get_or_create(Section, sections),
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -113,24 +319,35 @@ class BlogSerializer(serializers.ModelSerializer):
 
 
 class BlogDetailSerializer(BlogSerializer):
-    """Detailed blog (to-do)"""
+    """Detailed blog, including the users who liked it"""
+    expandable_fields = BlogSerializer.expandable_fields + ['likes']
+    likes = UserSerializer(many=True, required=False)
 
     class Meta(BlogSerializer.Meta):
-        fields = BlogSerializer.Meta.fields
+        fields = BlogSerializer.Meta.fields + ['likes']
 
 
-class BlogLikeSerializer(serializers.ModelSerializer):
-    """Serializer for likes"""
-    likes = UserSerializer(many=True, required=False)
+class BlogSearchSerializer(BlogSerializer):
+    """Serializer for search results, with rank and highlights"""
+    rank = serializers.FloatField(read_only=True)
+    title_highlight = serializers.CharField(read_only=True)
+    detail_highlight = serializers.CharField(read_only=True)
 
-    class Meta:
-        model = Blog
-        fields = ['id', 'likes']
-        read_only_fields = ['id']
-        extra_kwargs = {'likes': {'required': 'False'}}
+    class Meta(BlogSerializer.Meta):
+        fields = BlogSerializer.Meta.fields + [
+            'rank', 'title_highlight', 'detail_highlight',
+        ]
 
 
-class SectionImageSerializer(serializers.ModelSerializer):
+class BlogLikeSerializer(TimedSerializerMixin,
+                         NestingMixin,
+                         serializers.Serializer):
+    """Serializer for the outcome of toggling a like"""
+    liked = serializers.BooleanField(read_only=True)
+    like_count = serializers.IntegerField(read_only=True)
+
+
+class SectionImageSerializer(BaseModelSerializer):
     """Serializer for uploading images to a section"""
 
     class Meta:
@@ -140,21 +357,105 @@ class SectionImageSerializer(serializers.ModelSerializer):
         extra_kwargs = {'image': {'required': 'True'}}
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    """Serializer for comments"""
-    post = BlogSerializer(many=False, required=True)
+def _requester_pk(context):
+    """Return the pk of the user making the request in `context`, if any."""
+    request = context.get('request')
+    return getattr(getattr(request, 'user', None), 'pk', None)
+
+
+def _limit_choices(fields, name, queryset):
+    """Accept only the objects of `queryset` for the writable field `name`."""
+    field = fields.get(name)
+    if isinstance(field, serializers.PrimaryKeyRelatedField) \
+            and not field.read_only:
+        field.queryset = queryset
+
+
+def _keep_parent(serializer, attrs, name):
+    """Reject updates moving the instance to another parent `name`.
+
+    The parent's denormalized counters and cached lists are kept for
+    the parent an object is created under.
+    """
+    instance = serializer.instance
+    parent = attrs.get(name)
+    if instance is not None and parent is not None \
+            and parent.pk != getattr(instance, f'{name}_id'):
+        raise ValidationError({name: [
+            f'The {name} cannot be changed after creation.'
+        ]})
+
+    return attrs
+
+
+class CommentSerializer(BaseModelSerializer):
+    """Serializer for comments, referencing their post by id"""
+    depth_expansions = {'post': BlogSerializer}
 
     class Meta:
         model = Comment
         fields = ['id', 'body', 'post', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+    def get_fields(self):
+        """Accept only posts the requester can read, like the post views"""
+        fields = super().get_fields()
+        _limit_choices(fields, 'post', Blog.objects.filter(
+            Q(visible=True) | Q(user_id=_requester_pk(self.context)),
+        ))
+
+        return fields
+
+    def validate(self, attrs):
+        return _keep_parent(self, super().validate(attrs), 'post')
+
 
-class ReplySerializer(serializers.ModelSerializer):
-    """Serializer for replies"""
-    comment = CommentSerializer(many=False, required=True)
+class PostCommentSerializer(CommentSerializer):
+    """Serializer for comments of the post given in the URL"""
+
+    class Meta(CommentSerializer.Meta):
+        read_only_fields = CommentSerializer.Meta.read_only_fields + ['post']
+
+
+class ReplySerializer(BaseModelSerializer):
+    """Serializer for replies, referencing their comment by id"""
+    depth_expansions = {'comment': CommentSerializer}
 
     class Meta:
         model = Reply
         fields = ['id', 'body', 'comment', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+    def get_fields(self):
+        """Accept only comments on posts the requester can read"""
+        fields = super().get_fields()
+        _limit_choices(fields, 'comment', Comment.objects.filter(
+            Q(post__visible=True)
+            | Q(post__user_id=_requester_pk(self.context)),
+        ))
+
+        return fields
+
+    def validate(self, attrs):
+        return _keep_parent(self, super().validate(attrs), 'comment')
+
+
+class ThreadCommentSerializer(CommentSerializer):
+    """Serializer for a comment with its first replies"""
+    expandable_fields = ['replies']
+    reply_count = serializers.IntegerField(read_only=True)
+    replies = ReplySerializer(
+        many=True, read_only=True, source='thread_replies',
+    )
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['reply_count', 'replies']
+
+
+class CommentReplySerializer(ReplySerializer):
+    """Serializer for replies of the comment given in the URL"""
+
+    class Meta(ReplySerializer.Meta):
+        read_only_fields = ReplySerializer.Meta.read_only_fields + [
+            'comment',
+        ]
@@ -0,0 +1,172 @@
+"""
+Signal handlers keeping the blog response cache and search index consistent
+"""
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+
+from core.models import (
+    Blog,
+    Tag,
+    Section,
+    Comment,
+    Reply,
+)
+from blog import cache
+from blog.search import update_search_vectors
+
+
+def invalidate_posts(post_ids):
+    """Evict the posts and every cached list embedding them."""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+
+    owners = Blog.objects.filter(
+        id__in=post_ids,
+    ).values_list('user_id', flat=True)
+    cache.invalidate(
+        *(f'blog:{post_id}' for post_id in post_ids),
+        *(f'blog-list:{user_id}' for user_id in set(owners)),
+    )
+
+
+@receiver([post_save, post_delete], sender=Blog)
+def blog_changed(sender, instance, **kwargs):
+    cache.invalidate(f'blog-list:{instance.user_id}')
+    invalidate_posts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Blog.tags.through)
+@receiver(m2m_changed, sender=Blog.sections.through)
+@receiver(m2m_changed, sender=Blog.likes.through)
+def blog_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        post_ids = [instance.pk]
+    elif pk_set is not None:
+        post_ids = pk_set
+    else:
+        # a reverse clear: the links are still there before it runs
+        post_ids = sender.objects.filter(
+            **{sender._meta.get_field(
+                instance._meta.model_name
+            ).attname: instance.pk}
+        ).values_list('blog_id', flat=True)
+
+    if sender is not Blog.likes.through:
+        # assigned_only tag and section lists depend on the links too
+        owners = Blog.objects.filter(
+            id__in=list(post_ids),
+        ).values_list('user_id', flat=True)
+        cache.invalidate(*(
+            f'{name}-list:{user_id}'
+            for user_id in set(owners)
+            for name in ('tag', 'section')
+        ))
+    invalidate_posts(post_ids)
+
+
+@receiver([post_save, pre_delete], sender=Tag)
+@receiver([post_save, pre_delete], sender=Section)
+def attribute_changed(sender, instance, **kwargs):
+    cache.invalidate(f'{sender._meta.model_name}-list:{instance.user_id}')
+    relation = 'tags' if sender is Tag else 'sections'
+    invalidate_posts(
+        Blog.objects.filter(
+            **{relation: instance.pk}
+        ).values_list('id', flat=True)
+    )
+
+
+# the parent foreign key of each child model
+PARENT_FIELDS = {Comment: 'post_id', Reply: 'comment_id'}
+
+
+@receiver(pre_save, sender=Comment)
+@receiver(pre_save, sender=Reply)
+def collect_parent(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored parent of a child that may be moving."""
+    field = PARENT_FIELDS[sender]
+    if instance._state.adding or (
+        update_fields is not None
+        and not {field, field[:-len('_id')]} & set(update_fields)
+    ):
+        return
+
+    instance._parent_ids = set(
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True)
+    )
+
+
+def _parent_ids(sender, instance):
+    """Return the parents of `instance`, before and after its save."""
+    current = getattr(instance, PARENT_FIELDS[sender])
+    return instance.__dict__.pop('_parent_ids', set()) | {current}
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    post_ids = _parent_ids(sender, instance)
+    cache.invalidate(
+        f'comment:{instance.pk}',
+        f'comment-list:{instance.user_id}',
+        *(f'post-comment-list:{post_id}' for post_id in post_ids),
+    )
+    invalidate_posts(post_ids)
+
+
+@receiver([post_save, post_delete], sender=Reply)
+def reply_changed(sender, instance, **kwargs):
+    cache.invalidate(
+        f'reply:{instance.pk}',
+        f'reply-list:{instance.user_id}',
+        *(
+            f'comment-reply-list:{comment_id}'
+            for comment_id in _parent_ids(sender, instance)
+        ),
+    )
+
+
+@receiver(post_save, sender=Blog)
+def reindex_blog(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Blog.sections.through)
+def reindex_blog_sections(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_post_ids = list(
+            instance.blog_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        update_search_vectors(
+            getattr(instance, '_search_post_ids', [instance.pk])
+        )
+    elif action in ('post_add', 'post_remove'):
+        update_search_vectors(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Section)
+def reindex_section(sender, instance, **kwargs):
+    update_search_vectors(instance.blog_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Section)
+def collect_section_posts(sender, instance, **kwargs):
+    instance._search_post_ids = list(
+        instance.blog_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Section)
+def reindex_deleted_section(sender, instance, **kwargs):
+    update_search_vectors(getattr(instance, '_search_post_ids', []))
@@ -2,7 +2,10 @@
 Tests for the blog post api
 """
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.signals import m2m_changed
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -84,7 +87,7 @@ class PrivatepostAPITests(TestCase):
         posts = Blog.objects.all().order_by('-id')
         serializer = BlogSerializer(posts, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_post_detail(self):
         """Test get post details"""
@@ -345,7 +348,186 @@ class PrivatepostAPITests(TestCase):
         res = self.client.post(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'liked': False, 'like_count': 0})
         self.assertNotIn(self.user, post.likes.all())
         self.assertEqual(post.likes.count(), 0)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+
+    def test_like_other_users_post_error(self):
+        """Test liking another users post returns 404 and changes nothing"""
+        other = create_user(email='other@example.com', password='test123')
+        post = create_post(user=other)
+
+        res = self.client.post(post_like_url(post.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+        self.assertFalse(post.likes.exists())
+
+    def test_like_count_maintained(self):
+        """Test liking a post updates its like count"""
+        post = create_post(user=self.user)
+
+        res = self.client.post(post_like_url(post.id))
+
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(res.data, {'liked': True, 'like_count': 1})
+
+    def test_list_returns_counts_without_likers(self):
+        """Test the post list exposes counts instead of liker rows"""
+        post = create_post(user=self.user)
+        post.likes.add(self.user)
+        Blog.objects.filter(id=post.id).update(like_count=1)
+
+        res = self.client.get(BLOG_URL)
+
+        item = res.data['results'][0]
+        self.assertEqual(item['like_count'], 1)
+        self.assertEqual(item['comment_count'], 0)
+        self.assertNotIn('likes', item)
+
+    def test_detail_likers_omit_password(self):
+        """Test the likers embedded in a post never expose passwords"""
+        post = create_post(user=self.user)
+        post.likes.add(self.user)
+
+        res = self.client.get(detail_url(post.id))
+
+        self.assertEqual(len(res.data['likes']), 1)
+        self.assertNotIn('password', res.data['likes'][0])
 
     # TO DO: ADD MORE RIGOROUS TESTS FOR PUT PATCH DELETE AND SECTION IMAGE UPLOAD
+
+
+class BlogQueryBudgetTests(TestCase):
+    """Test the post endpoints run a fixed number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_posts(self, count):
+        """Create posts with every nested relation populated."""
+        posts = []
+        for i in range(count):
+            post = create_post(user=self.user, title=f'post {i}')
+            post.tags.add(
+                Tag.objects.create(user=self.user, name=f'tag {i}'),
+            )
+            post.sections.add(
+                Section.objects.create(user=self.user, header=f'header {i}'),
+            )
+            post.likes.add(self.user)
+            posts.append(post)
+
+        return posts
+
+    def test_list_query_count_independent_of_size(self):
+        """Test listing posts does not issue a query per post."""
+        self._create_posts(3)
+        with self.assertNumQueries(3):
+            res = self.client.get(BLOG_URL)
+        self.assertEqual(len(res.data['results']), 3)
+
+        self._create_posts(10)
+        with self.assertNumQueries(3):
+            res = self.client.get(BLOG_URL)
+        self.assertEqual(len(res.data['results']), 13)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a post loads its relations in bulk."""
+        post = self._create_posts(1)[0]
+
+        with self.assertNumQueries(4):
+            self.client.get(detail_url(post.id))
+
+    def test_create_query_count_independent_of_sections(self):
+        """Test creating a post costs the same for 2 or 30 sections."""
+        Section.objects.create(
+            user=self.user, header='header 0', description='existing',
+        )
+
+        def payload(count):
+            return {
+                'title': 'post',
+                'tags': [{'name': f'tag {i}'} for i in range(count)],
+                'sections': [
+                    {'header': f'header {i}', 'description': 'existing'}
+                    for i in range(count)
+                ],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(BLOG_URL, payload(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.post(BLOG_URL, payload(30), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(large), len(small))
+        post = Blog.objects.get(id=res.data['id'])
+        self.assertEqual(post.sections.count(), 30)
+        self.assertEqual(
+            Section.objects.filter(header='header 0').count(), 1,
+        )
+
+    def test_update_touches_only_changed_links(self):
+        """Test swapping one section leaves the other links alone."""
+        post = create_post(user=self.user)
+        sections = [
+            Section.objects.create(
+                user=self.user, header=f'header {i}', description='',
+            )
+            for i in range(20)
+        ]
+        post.sections.add(*sections)
+        kept = post.sections.through.objects.filter(
+            section__in=sections[1:],
+        ).values_list('id', flat=True)
+        kept_ids = set(kept)
+        changes = []
+
+        def record(sender, action, pk_set, **kwargs):
+            if action in ('pre_clear', 'post_add', 'post_remove'):
+                changes.append((action, pk_set))
+
+        payload = {'sections': [
+            {'header': section.header, 'description': ''}
+            for section in sections[1:]
+        ] + [{'header': 'new header', 'description': ''}]}
+        m2m_changed.connect(record, sender=Blog.sections.through)
+        try:
+            res = self.client.patch(detail_url(post.id), payload,
+                                    format='json')
+        finally:
+            m2m_changed.disconnect(record, sender=Blog.sections.through)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        new = Section.objects.get(user=self.user, header='new header')
+        self.assertEqual(changes, [
+            ('post_remove', {sections[0].id}),
+            ('post_add', {new.id}),
+        ])
+        self.assertEqual(set(kept), kept_ids)
+        self.assertEqual(post.sections.count(), 20)
+
+    def test_like_post_query_count_independent_of_likes(self):
+        """Test toggling a like costs the same for 1 or 30 likers."""
+        small, large = self._create_posts(2)
+        for i in range(30):
+            large.likes.add(create_user(email=f'liker{i}@example.com'))
+        Blog.objects.filter(id=large.id).update(like_count=31)
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(post_like_url(small.id))
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.post(post_like_url(large.id))
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(res.data, {'liked': False, 'like_count': 30})
@@ -0,0 +1,175 @@
+"""
+Tests for the shared response cache
+"""
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import (
+    Blog,
+    Comment,
+    Reply,
+    Tag,
+)
+
+from blog import cache
+
+
+BLOG_URL = reverse('blog:blog-list')
+TAGS_URL = reverse('blog:tag-list')
+
+
+def detail_url(blog_id):
+    """Create and return a blog detail URL."""
+    return reverse('blog:blog-detail', args=[blog_id])
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class ResponseCacheTests(TestCase):
+    """Test cached GET responses and their invalidation."""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        # hit and miss counts go to the metrics of this test alone
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(metrics.reset, directory.name)
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Blog.objects.create(user=self.user, title='post')
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request runs no queries."""
+        first = self.client.get(BLOG_URL)
+
+        # the conditional GET validator is the only query left
+        with self.assertNumQueries(1):
+            second = self.client.get(BLOG_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        stats = cache.get_stats(['blog:blog-list'])['blog:blog-list']
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_stats_outlive_cache_entries(self):
+        """Test clearing or culling the cache keeps the hit counts."""
+        self.client.get(BLOG_URL)
+        self.client.get(BLOG_URL)
+
+        cache.get_cache().clear()
+
+        stats = cache.get_stats(['blog:blog-list'])['blog:blog-list']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['ratio'], 0.5)
+
+    def test_query_string_normalized(self):
+        """Test parameter order does not split cache entries."""
+        self.client.get(BLOG_URL, {'page_size': 5, 'tags': ''})
+
+        self.client.get(f'{BLOG_URL}?tags=&page_size=5')
+
+        stats = cache.get_stats(['blog:blog-list'])['blog:blog-list']
+        self.assertEqual(stats['hits'], 1)
+
+    def test_like_evicts_post(self):
+        """Test liking a post evicts its cached detail."""
+        self.client.get(detail_url(self.post.id))
+
+        self.client.post(reverse('blog:blog-like-post', args=[self.post.id]))
+        res = self.client.get(detail_url(self.post.id))
+
+        self.assertEqual(res.data['like_count'], 1)
+
+    def test_comment_evicts_post_only(self):
+        """Test a new comment evicts its post but not other posts."""
+        other = Blog.objects.create(user=self.user, title='other')
+        self.client.get(detail_url(self.post.id))
+        self.client.get(detail_url(other.id))
+
+        Comment.objects.create(user=self.user, post=self.post, body='hi')
+        self.client.get(detail_url(self.post.id))
+        self.client.get(detail_url(other.id))
+
+        stats = cache.get_stats(['blog:blog-detail'])['blog:blog-detail']
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 3)
+
+    def test_moved_comment_evicts_both_posts(self):
+        """Test moving a comment evicts the comment lists of both posts."""
+        other = Blog.objects.create(user=self.user, title='other')
+        comment = Comment.objects.create(
+            user=self.user, post=self.post, body='hi',
+        )
+        old_url = reverse('blog:post-comment-list', args=[self.post.id])
+        new_url = reverse('blog:post-comment-list', args=[other.id])
+        self.client.get(old_url)
+        self.client.get(new_url)
+
+        comment.post = other
+        comment.save()
+
+        self.assertEqual(self.client.get(old_url).data['results'], [])
+        self.assertEqual(
+            [item['id'] for item in self.client.get(new_url).data['results']],
+            [comment.id],
+        )
+
+    def test_moved_reply_evicts_both_comments(self):
+        """Test moving a reply evicts the reply lists of both comments."""
+        first, second = (
+            Comment.objects.create(user=self.user, post=self.post, body='c')
+            for _ in range(2)
+        )
+        reply = Reply.objects.create(user=self.user, comment=first, body='r')
+        old_url = reverse('blog:comment-reply-list', args=[first.id])
+        self.client.get(old_url)
+
+        reply.comment = second
+        reply.save(update_fields=['comment'])
+
+        self.assertEqual(self.client.get(old_url).data['results'], [])
+
+    def test_tag_rename_evicts_posts_and_tags(self):
+        """Test renaming a tag evicts the tag list and posts using it."""
+        tag = Tag.objects.create(user=self.user, name='old')
+        self.post.tags.add(tag)
+        self.client.get(TAGS_URL)
+        self.client.get(detail_url(self.post.id))
+
+        tag.name = 'new'
+        tag.save()
+
+        self.assertEqual(self.client.get(TAGS_URL).data[0]['name'], 'new')
+        res = self.client.get(detail_url(self.post.id))
+        self.assertEqual(res.data['tags'][0]['name'], 'new')
+
+    def test_cache_scoped_to_user(self):
+        """Test one user's cached list is never served to another."""
+        self.client.get(BLOG_URL)
+        other = create_user(email='other@example.com', password='pass1234')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(BLOG_URL)
+
+        self.assertEqual(res.data['results'], [])
@@ -2,8 +2,10 @@
 Tests for the comments API.
 """
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -11,6 +13,7 @@ from rest_framework.test import APIClient
 from core.models import (
     Comment,
     Blog,
+    Reply,
 )
 
 from blog.serializers import (
@@ -31,6 +34,16 @@ def post_like_url(comment_id):
     return reverse('blog:comment-like-post', args=[comment_id])
 
 
+def post_comments_url(post_id):
+    """Create and return the comment list URL of a post."""
+    return reverse('blog:post-comment-list', args=[post_id])
+
+
+def post_thread_url(post_id):
+    """Create and return the comment thread URL of a post."""
+    return reverse('blog:post-comment-thread', args=[post_id])
+
+
 def create_post(user, **params):
     """Create and return a sample comment post"""
     defaults = {
@@ -84,7 +97,7 @@ class PrivateCommentAPITests(TestCase):
         comments = Comment.objects.all().order_by('-created_at')
         serializer = CommentSerializer(comments, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_update_comment(self):
         """Test updating a comment"""
@@ -108,3 +121,272 @@ class PrivateCommentAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         comments = Comment.objects.filter(user=self.user)
         self.assertFalse(comments.exists())
+
+    def test_update_comment_post_rejected(self):
+        """Test a comment cannot be moved to another post"""
+        comment = Comment.objects.create(
+            user=self.user, post=self.post, body='body 1',
+        )
+        other = create_post(user=self.user)
+
+        res = self.client.patch(detail_url(comment.id), {'post': other.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('post', res.data)
+        comment.refresh_from_db()
+        self.assertEqual(comment.post, self.post)
+
+    def test_update_comment_same_post(self):
+        """Test a full update may repeat the comment's post"""
+        comment = Comment.objects.create(
+            user=self.user, post=self.post, body='body 1',
+        )
+
+        res = self.client.put(
+            detail_url(comment.id), {'body': 'body 2', 'post': self.post.id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        comment.refresh_from_db()
+        self.assertEqual(comment.body, 'body 2')
+
+    def test_delete_comment_updates_count(self):
+        """Test deleting a comment decrements the post comment count"""
+        comment = Comment.objects.create(
+            user=self.user, post=self.post, body='body 1',
+        )
+        Blog.objects.filter(id=self.post.id).update(comment_count=1)
+
+        self.client.delete(detail_url(comment.id))
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_create_comment_with_post_id(self):
+        """Test creating a comment references its post by id"""
+        payload = {'body': 'body', 'post': self.post.id}
+
+        res = self.client.post(COMMENT_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['post'], self.post.id)
+        comment = Comment.objects.get(id=res.data['id'])
+        self.assertEqual(comment.post, self.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_create_comment_on_hidden_post_rejected(self):
+        """Test a comment on another user's hidden post is rejected"""
+        other = create_user(email='other@example.com', password='pass1234')
+        hidden = create_post(user=other, visible=False)
+        payload = {'body': 'body', 'post': hidden.id}
+
+        res = self.client.post(COMMENT_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('post', res.data)
+        self.assertFalse(Comment.objects.filter(post=hidden).exists())
+        hidden.refresh_from_db()
+        self.assertEqual(hidden.comment_count, 0)
+
+    def test_create_comment_on_own_hidden_post(self):
+        """Test users can comment on their own hidden posts"""
+        hidden = create_post(user=self.user, visible=False)
+        payload = {'body': 'body', 'post': hidden.id}
+
+        res = self.client.post(COMMENT_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
+class PostCommentAPITests(TestCase):
+    """Test the comments endpoint of a single post"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.other = create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.post = create_post(user=self.other)
+        self.client.force_authenticate(self.user)
+
+    def test_list_post_comments(self):
+        """Test every user's comments on the post are listed by id"""
+        Comment.objects.create(user=self.user, post=self.post, body='one')
+        Comment.objects.create(user=self.other, post=self.post, body='two')
+        Comment.objects.create(
+            user=self.user, post=create_post(user=self.user), body='other',
+        )
+
+        res = self.client.get(post_comments_url(self.post.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [comment['body'] for comment in res.data['results']],
+            ['two', 'one'],
+        )
+        self.assertEqual(res.data['results'][0]['post'], self.post.id)
+
+    def test_list_query_count_independent_of_size(self):
+        """Test a page of comments costs the same for 2 or 20 comments"""
+        def count_queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(post_comments_url(self.post.id))
+            return len(captured)
+
+        for i in range(2):
+            Comment.objects.create(user=self.user, post=self.post, body='b')
+        small = count_queries()
+        for i in range(18):
+            Comment.objects.create(user=self.other, post=self.post, body='b')
+
+        self.assertEqual(count_queries(), small)
+
+    def test_create_post_comment(self):
+        """Test creating a comment takes the post from the URL"""
+        other_post = create_post(user=self.user)
+        payload = {'body': 'hello', 'post': other_post.id}
+
+        res = self.client.post(post_comments_url(self.post.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        comment = Comment.objects.get(id=res.data['id'])
+        self.assertEqual(comment.post, self.post)
+        self.assertEqual(comment.user, self.user)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_new_comment_evicts_cached_list(self):
+        """Test a cached comment list is not served after a new comment"""
+        url = post_comments_url(self.post.id)
+        self.client.get(url)
+
+        self.client.post(url, {'body': 'hello'})
+        res = self.client.get(url)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_retrieve_post_comment(self):
+        """Test retrieving one comment of the post, and only of that post"""
+        comment = Comment.objects.create(
+            user=self.other, post=self.post, body='body',
+        )
+        url = reverse(
+            'blog:post-comment-detail', args=[self.post.id, comment.id],
+        )
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['body'], 'body')
+
+        other_post = create_post(user=self.user)
+        url = reverse(
+            'blog:post-comment-detail', args=[other_post.id, comment.id],
+        )
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hidden_post_comments_not_found(self):
+        """Test another user's hidden post has no visible comments"""
+        hidden = create_post(user=self.other, visible=False)
+
+        res = self.client.get(post_comments_url(hidden.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.post(post_comments_url(hidden.id), {'body': 'b'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Comment.objects.exists())
+
+
+class PostThreadAPITests(TestCase):
+    """Test the comment thread endpoint of a post"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = create_post(user=self.user)
+
+    def _comment(self, replies):
+        comment = Comment.objects.create(
+            user=self.user, post=self.post, body='comment',
+        )
+        for i in range(replies):
+            Reply.objects.create(
+                user=self.user, comment=comment, body=f'reply {i}',
+            )
+        return comment
+
+    def test_thread_first_replies_and_counts(self):
+        """Test each comment carries its oldest replies and total count"""
+        busy = self._comment(replies=5)
+        quiet = self._comment(replies=1)
+        empty = self._comment(replies=0)
+
+        res = self.client.get(post_thread_url(self.post.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        threads = {item['id']: item for item in res.data['results']}
+        self.assertEqual(threads[busy.id]['reply_count'], 5)
+        self.assertEqual(
+            [reply['body'] for reply in threads[busy.id]['replies']],
+            ['reply 0', 'reply 1', 'reply 2'],
+        )
+        self.assertEqual(threads[quiet.id]['reply_count'], 1)
+        self.assertEqual(len(threads[quiet.id]['replies']), 1)
+        self.assertEqual(threads[empty.id]['reply_count'], 0)
+        self.assertEqual(threads[empty.id]['replies'], [])
+
+    def test_thread_newest_replies(self):
+        """Test order=newest and replies=N pick the newest N replies"""
+        comment = self._comment(replies=4)
+
+        res = self.client.get(
+            post_thread_url(self.post.id), {'order': 'newest', 'replies': 2},
+        )
+
+        thread = res.data['results'][0]
+        self.assertEqual(thread['id'], comment.id)
+        self.assertEqual(
+            [reply['body'] for reply in thread['replies']],
+            ['reply 3', 'reply 2'],
+        )
+
+    def test_thread_counts_without_replies(self):
+        """Test replies=0 still returns the reply counts"""
+        self._comment(replies=2)
+
+        res = self.client.get(post_thread_url(self.post.id), {'replies': 0})
+
+        thread = res.data['results'][0]
+        self.assertEqual(thread['replies'], [])
+        self.assertEqual(thread['reply_count'], 2)
+
+    def test_thread_query_count_independent_of_size(self):
+        """Test a page of threads costs the same for 1 or 10 comments"""
+        def count_queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(post_thread_url(self.post.id))
+            return len(captured)
+
+        self._comment(replies=4)
+        small = count_queries()
+        for i in range(9):
+            self._comment(replies=i)
+
+        self.assertEqual(count_queries(), small)
+
+    def test_thread_invalid_parameters(self):
+        """Test invalid reply limits and orders are rejected"""
+        url = post_thread_url(self.post.id)
+        for params in [{'replies': 21}, {'replies': 'x'}, {'order': 'up'}]:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
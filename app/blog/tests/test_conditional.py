@@ -0,0 +1,143 @@
+"""
+Tests for conditional GET on the blog APIs
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Tag,
+)
+from blog import cache
+
+
+BLOG_URL = reverse('blog:blog-list')
+TAGS_URL = reverse('blog:tag-list')
+
+
+def detail_url(blog_id):
+    """Create and return a blog detail URL."""
+    return reverse('blog:blog-detail', args=[blog_id])
+
+
+def tag_detail_url(tag_id):
+    """Create and return a tag detail URL."""
+    return reverse('blog:tag-detail', args=[tag_id])
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Blog.objects.create(user=self.user, title='post')
+
+    def test_detail_not_modified(self):
+        """Test a matching ETag returns 304 after a single query."""
+        res = self.client.get(detail_url(self.post.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.post.id), HTTP_IF_NONE_MATCH=res['ETag'],
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unconditional_get_runs_no_validator_query(self):
+        """Test a plain GET takes its validators from the loaded rows."""
+        etag = self.client.get(BLOG_URL)['ETag']
+        cache.get_cache().clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(BLOG_URL)
+
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(
+            sum('"updated_at"' in query['sql']
+                for query in ctx.captured_queries),
+            1,
+        )
+
+    def test_cached_response_keeps_validators(self):
+        """Test a response served from the cache still has its ETag."""
+        first = self.client.get(detail_url(self.post.id))
+        second = self.client.get(detail_url(self.post.id))
+
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Last-Modified'], first['Last-Modified'])
+
+    def test_detail_modified_after_update(self):
+        """Test editing a post invalidates its ETag."""
+        etag = self.client.get(detail_url(self.post.id))['ETag']
+        self.client.patch(detail_url(self.post.id), {'title': 'new'})
+
+        res = self.client.get(
+            detail_url(self.post.id), HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'new')
+
+    def test_detail_modified_after_like(self):
+        """Test liking a post invalidates its ETag."""
+        etag = self.client.get(detail_url(self.post.id))['ETag']
+        self.client.post(reverse('blog:blog-like-post', args=[self.post.id]))
+
+        res = self.client.get(
+            detail_url(self.post.id), HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_modified_after_tag_rename(self):
+        """Test renaming an embedded tag invalidates the post ETag."""
+        tag = Tag.objects.create(user=self.user, name='old')
+        self.post.tags.add(tag)
+        etag = self.client.get(detail_url(self.post.id))['ETag']
+        self.client.patch(tag_detail_url(tag.id), {'name': 'new'})
+
+        res = self.client.get(
+            detail_url(self.post.id), HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'new')
+
+    def test_list_not_modified(self):
+        """Test the list answers 304 until a post is added or removed."""
+        etag = self.client.get(BLOG_URL)['ETag']
+
+        res = self.client.get(BLOG_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.post.delete()
+        res = self.client.get(BLOG_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_if_modified_since(self):
+        """Test If-Modified-Since is honoured for lists."""
+        Tag.objects.create(user=self.user, name='tag')
+        last_modified = self.client.get(TAGS_URL)['Last-Modified']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,93 @@
+"""
+Tests for the streaming post export
+"""
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Section,
+    Tag,
+)
+from blog.views import BlogViewSet
+
+
+BLOG_URL = reverse('blog:blog-list')
+EXPORT_URL = reverse('blog:blog-export')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class PostExportTests(TestCase):
+    """Test the NDJSON post export."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='tag')
+        for i in range(5):
+            post = Blog.objects.create(user=self.user, title=f'post {i}')
+            post.tags.add(tag)
+            post.sections.add(
+                Section.objects.create(user=self.user, header=f'header {i}'),
+            )
+        other = create_user(email='other@example.com', password='test123')
+        Blog.objects.create(user=other, title='other')
+
+    def _lines(self, res):
+        body = b''.join(res.streaming_content)
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_export_streams_every_post(self):
+        """Test the export holds the user's posts as the list renders them"""
+        res = self.client.get(
+            EXPORT_URL, HTTP_ACCEPT='application/x-ndjson',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        items = self._lines(res)
+        listed = self.client.get(BLOG_URL).json()['results']
+        self.assertEqual(items, listed[::-1])
+
+    def test_export_relation_queries_per_chunk(self):
+        """Test relations are fetched once per chunk, not once per post"""
+        with patch.object(BlogViewSet, 'export_chunk_size', 2), \
+                CaptureQueriesContext(connection) as captured:
+            res = self.client.get(EXPORT_URL)
+            items = self._lines(res)
+
+        self.assertEqual(len(items), 5)
+        tag_queries = [
+            query for query in captured
+            if 'FROM "core_blog_tags"' in query['sql']
+        ]
+        self.assertEqual(len(tag_queries), 3)
+
+    def test_export_fields_and_filters(self):
+        """Test sparse fields and post filters apply to the export"""
+        res = self.client.get(EXPORT_URL, {
+            'fields': 'id,title',
+            'created_after': '2000-01-01',
+        })
+
+        items = self._lines(res)
+        self.assertEqual(len(items), 5)
+        self.assertEqual(set(items[0]), {'id', 'title'})
@@ -0,0 +1,80 @@
+"""
+Tests for the values() list rendering
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Section,
+    Tag,
+)
+from blog.fastpath import ValuesSerializer
+from blog.serializers import BlogSerializer
+
+
+BLOG_URL = reverse('blog:blog-list')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class ValuesSerializerTests(TestCase):
+    """Test the values() rendering matches the model serializer."""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+            for i in range(3)
+        ]
+        section = Section.objects.create(
+            user=self.user, header='header', description='ünïcode',
+        )
+        post = Blog.objects.create(
+            user=self.user, title='post', featured=True, visit_count=3,
+        )
+        # linked out of id order
+        post.tags.add(tags[2])
+        post.tags.add(tags[0])
+        post.sections.add(section)
+        Blog.objects.create(user=self.user, title=None, detail=None)
+
+    def test_output_is_byte_identical(self):
+        """Test both paths render the same JSON bytes."""
+        queryset = Blog.objects.filter(user=self.user).order_by('-id')
+        prefetched = queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('sections', queryset=Section.objects.order_by('id')),
+        )
+        expected = BlogSerializer(prefetched, many=True).data
+
+        fast = ValuesSerializer(BlogSerializer())
+        data = fast.to_representation(fast.get_values(queryset))
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(data), renderer.render(expected))
+
+    def test_list_endpoint_uses_values(self):
+        """Test the list endpoint renders sparse fields from values()."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(BLOG_URL, {'fields': 'id,title,tags'})
+
+        post = res.data['results'][1]
+        self.assertEqual(list(post), ['id', 'title', 'tags'])
+        self.assertEqual(
+            [tag['name'] for tag in post['tags']], ['tag 0', 'tag 2'],
+        )
+        self.assertEqual(res.data['results'][0]['tags'], [])
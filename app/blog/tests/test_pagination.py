@@ -0,0 +1,163 @@
+"""
+Tests for keyset pagination of the blog APIs
+"""
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Comment,
+)
+
+
+BLOG_URL = reverse('blog:blog-list')
+COMMENT_URL = reverse('blog:comment-list')
+
+
+def cursor(position):
+    """Return a cursor holding `position`, as a client could forge it."""
+    return base64.urlsafe_b64encode(
+        json.dumps({'p': position}).encode('utf-8')
+    ).decode('ascii')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of list endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, params):
+        """Follow next links and return the ids of every page."""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([item['id'] for item in res.data['results']])
+            if res.data['next'] is None:
+                return pages, res
+            res = self.client.get(res.data['next'])
+
+    def test_posts_paginated_newest_first(self):
+        """Test walking every page of posts visits each post once."""
+        posts = [
+            Blog.objects.create(user=self.user, title=f'post {i}')
+            for i in range(7)
+        ]
+
+        pages, _ = self._walk(BLOG_URL, {'page_size': 3})
+
+        expected = [post.id for post in reversed(posts)]
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_link_returns_prior_page(self):
+        """Test the previous link walks back to the same page."""
+        for i in range(5):
+            Blog.objects.create(user=self.user, title=f'post {i}')
+
+        first = self.client.get(BLOG_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_comments_with_equal_timestamps(self):
+        """Test ties on created_at are broken by id without gaps."""
+        post = Blog.objects.create(user=self.user, title='post')
+        comments = [
+            Comment.objects.create(user=self.user, post=post, body=str(i))
+            for i in range(5)
+        ]
+        Comment.objects.update(created_at=timezone.now())
+
+        pages, _ = self._walk(COMMENT_URL, {'page_size': 2})
+
+        expected = [comment.id for comment in reversed(comments)]
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_deep_page_uses_no_offset_or_count(self):
+        """Test paging issues neither OFFSET nor COUNT(*)."""
+        for i in range(6):
+            Blog.objects.create(user=self.user, title=f'post {i}')
+        first = self.client.get(BLOG_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+
+        for query in ctx.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'])
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_cursor_is_row_comparison(self):
+        """Test the page edge is one row-value comparison."""
+        post = Blog.objects.create(user=self.user, title='post')
+        for i in range(3):
+            Comment.objects.create(user=self.user, post=post, body=str(i))
+        first = self.client.get(COMMENT_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+
+        self.assertTrue(any(
+            '("core_comment"."created_at", "core_comment"."id") < ('
+            in query['sql']
+            for query in ctx.captured_queries
+        ))
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor returns 404."""
+        res = self.client.get(BLOG_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_checked(self):
+        """Test cursor values of the wrong type return 404, not 500."""
+        for url, position in (
+            (BLOG_URL, ['abc']),
+            (BLOG_URL, [None]),
+            (BLOG_URL, [{'x': 1}]),
+            (BLOG_URL, [True]),
+            (BLOG_URL, [1.5]),
+            (BLOG_URL, [2 ** 70]),
+            (COMMENT_URL, ['notadate', 1]),
+            (COMMENT_URL, ['2020-13-45T00:00:00+00:00', 1]),
+            (COMMENT_URL, ['2020-01-01T00:00:00', 1]),
+            (COMMENT_URL, [1, 1]),
+            (COMMENT_URL, ['2020-01-01T00:00:00+00:00', '1']),
+        ):
+            res = self.client.get(url, {'cursor': cursor(position)})
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, position,
+            )
+
+    def test_forged_valid_cursor(self):
+        """Test a well typed cursor is accepted even if not issued."""
+        res = self.client.get(COMMENT_URL, {
+            'cursor': cursor(['2020-01-01T00:00:00+00:00', 1]),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
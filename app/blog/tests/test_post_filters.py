@@ -0,0 +1,139 @@
+"""
+Tests for filtering the post list
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Section,
+    Tag,
+)
+
+
+BLOG_URL = reverse('blog:blog-list')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class PostFilterTests(TestCase):
+    """Test the post filter query parameters."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.tag1 = Tag.objects.create(user=self.user, name='one')
+        self.tag2 = Tag.objects.create(user=self.user, name='two')
+        self.both = Blog.objects.create(user=self.user, title='both')
+        self.both.tags.add(self.tag1, self.tag2)
+        self.first = Blog.objects.create(user=self.user, title='first')
+        self.first.tags.add(self.tag1)
+        self.none = Blog.objects.create(
+            user=self.user, title='none', featured=True, visible=False,
+        )
+
+    def _ids(self, params):
+        res = self.client.get(BLOG_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {item['id'] for item in res.data['results']}
+
+    def test_filter_tags_any(self):
+        """Test posts with any of the tags are returned once each."""
+        ids = self._ids({'tags': f'{self.tag1.id},{self.tag2.id}'})
+
+        self.assertEqual(ids, {self.both.id, self.first.id})
+
+    def test_filter_tags_all(self):
+        """Test posts must carry every tag in all mode."""
+        ids = self._ids({
+            'tags': f'{self.tag1.id},{self.tag2.id}',
+            'tags_mode': 'all',
+        })
+
+        self.assertEqual(ids, {self.both.id})
+
+    def test_filter_sections(self):
+        """Test filtering by sections, which was previously ignored."""
+        section = Section.objects.create(user=self.user, header='s')
+        self.first.sections.add(section)
+
+        ids = self._ids({'sections': str(section.id)})
+
+        self.assertEqual(ids, {self.first.id})
+
+    def test_filter_flags(self):
+        """Test the featured and visible flags."""
+        self.assertEqual(self._ids({'featured': '1'}), {self.none.id})
+        self.assertEqual(
+            self._ids({'visible': 'true'}), {self.both.id, self.first.id},
+        )
+
+    def test_filter_created_range(self):
+        """Test the created_at range bounds."""
+        past = timezone.now() - timedelta(days=10)
+        Blog.objects.filter(id=self.first.id).update(created_at=past)
+        boundary = (past + timedelta(days=1)).isoformat()
+
+        self.assertEqual(
+            self._ids({'created_before': boundary}), {self.first.id},
+        )
+        self.assertEqual(
+            self._ids({'created_after': boundary}),
+            {self.both.id, self.none.id},
+        )
+
+    def test_filters_compose(self):
+        """Test filters are ANDed together."""
+        ids = self._ids({'tags': str(self.tag1.id), 'featured': '0'})
+
+        self.assertEqual(ids, {self.both.id, self.first.id})
+
+    def test_semi_join_without_distinct(self):
+        """Test relation filters use EXISTS instead of join+DISTINCT."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(BLOG_URL, {'tags': str(self.tag1.id)})
+
+        sql = '\n'.join(query['sql'] for query in ctx.captured_queries)
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_invalid_values_rejected(self):
+        """Test malformed filter values return 400."""
+        for params in (
+            {'tags': 'a,b'},
+            {'tags_mode': 'some', 'tags': '1'},
+            {'featured': 'maybe'},
+            {'created_after': 'yesterday'},
+        ):
+            res = self.client.get(BLOG_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range_dates_rejected(self):
+        """Test well formed but impossible dates return 400, not 500."""
+        for params in (
+            {'created_after': '2020-13-45'},
+            {'created_before': '2020-02-30T10:00:00'},
+            {'created_after': '2020-01-01T25:00:00+00:00'},
+        ):
+            res = self.client.get(BLOG_URL, params)
+
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params,
+            )
+            self.assertIn(next(iter(params)), res.data)
@@ -0,0 +1,285 @@
+"""
+Tests for the query plans of the blog APIs at seeded scale
+"""
+import json
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Comment,
+    Reply,
+    Section,
+    Tag,
+)
+from blog import cache
+
+
+# many users with a few pages of posts each, so a user's rows are a small
+# share of every table, as they are in production
+USERS = 200
+POSTS_PER_USER = 100
+ATTRS_PER_USER = 20
+COMMENTS_PER_POST = 1
+REPLIES_PER_COMMENT = 1
+# comments on the tested post and replies to the tested comment, more
+# than a page so its ordering index beats sorting every child
+HOT_CHILDREN = 200
+
+# tables no list may read whole
+SEEDED_TABLES = {
+    'core_blog',
+    'core_blog_tags',
+    'core_blog_sections',
+    'core_tag',
+    'core_section',
+    'core_comment',
+    'core_reply',
+}
+
+
+# whole table reads the planner picks for tables as small as the seeded
+# ones; turned off so any left in a plan mean no index serves the query
+WHOLE_TABLE_PLANS = ['enable_seqscan', 'enable_hashjoin', 'enable_mergejoin']
+
+
+def table_scans(plan):
+    """Return the relations read whole anywhere in the plan.
+
+    That is every Seq Scan, and every index scan without an index
+    condition, which walks the full index instead of the table.
+    """
+    found = []
+    node_type = plan['Node Type']
+    if node_type == 'Seq Scan' or (
+        node_type in ('Index Scan', 'Index Only Scan')
+        and 'Index Cond' not in plan
+    ):
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(table_scans(child))
+
+    return found
+
+
+def plan_indexes(plan):
+    """Return the names of the indexes read anywhere in the plan."""
+    found = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', []):
+        found |= plan_indexes(child)
+
+    return found
+
+
+def model_index(model, *fields):
+    """Return the name of the index of `model` on exactly `fields`.
+
+    Partial indexes are only matched by name, so the lookup is not
+    ambiguous with the full index they share fields with.
+    """
+    for index in model._meta.indexes:
+        if index.condition is None and list(index.fields) == list(fields):
+            return index.name
+
+    raise LookupError(f'{model.__name__} has no index on {fields}')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'needs PostgreSQL')
+class QueryPlanTests(TestCase):
+    """Test every hot list reads its rows through an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'user{i}@example.com')
+            for i in range(USERS)
+        )
+        cls.user = users[0]
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}')
+            for user in users for i in range(ATTRS_PER_USER)
+        )
+        Section.objects.bulk_create(
+            Section(user=user, header=f'header {i}')
+            for user in users for i in range(ATTRS_PER_USER)
+        )
+        # interleave the users' posts, as they are written in production
+        posts = Blog.objects.bulk_create(
+            Blog(
+                user=user,
+                title=f'post {i}',
+                featured=i % 10 == 0,
+                visible=i % 10 != 5,
+            )
+            for i in range(POSTS_PER_USER) for user in users
+        )
+        comments = Comment.objects.bulk_create(
+            Comment(user=users[i % USERS], post=post, body='comment')
+            for post in posts for i in range(COMMENTS_PER_POST)
+        )
+        comments += Comment.objects.bulk_create(
+            Comment(user=users[i % USERS], post=posts[0], body='comment')
+            for i in range(HOT_CHILDREN)
+        )
+        Reply.objects.bulk_create(
+            Reply(user=users[i % USERS], comment=comment, body='reply')
+            for comment in comments for i in range(REPLIES_PER_COMMENT)
+        )
+        Reply.objects.bulk_create(
+            Reply(user=users[i % USERS], comment=comments[0], body='reply')
+            for i in range(HOT_CHILDREN)
+        )
+        tags = {}
+        for tag in Tag.objects.all():
+            tags.setdefault(tag.user_id, []).append(tag)
+        sections = {}
+        for section in Section.objects.all():
+            sections.setdefault(section.user_id, []).append(section)
+        Blog.tags.through.objects.bulk_create(
+            Blog.tags.through(blog=post, tag=tags[post.user_id][i % 10 + j])
+            for i, post in enumerate(posts) for j in (0, 10)
+        )
+        Blog.sections.through.objects.bulk_create(
+            Blog.sections.through(
+                blog=post, section=sections[post.user_id][i % 10 + j],
+            )
+            for i, post in enumerate(posts) for j in (0, 10)
+        )
+        cls.post = posts[0]
+        cls.comment = comments[0]
+
+        with connection.cursor() as cursor:
+            # bulk_create stamps every row with the same creation time
+            for table in ('core_comment', 'core_reply'):
+                cursor.execute(
+                    f'UPDATE {table} '
+                    f"SET created_at = now() - id * interval '1 minute'"
+                )
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _plans(self, url, params=None):
+        """Request `url` and return the JSON plan of every SELECT run."""
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200, res.content)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for setting in WHOLE_TABLE_PLANS:
+                cursor.execute(f'SET {setting} = off')
+            for query in captured:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {query["sql"]}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                plans.append((query['sql'], plan[0]['Plan']))
+            for setting in WHOLE_TABLE_PLANS:
+                cursor.execute(f'RESET {setting}')
+
+        return plans
+
+    def assertIndexed(self, url, params=None, index=None):
+        """Assert no query of the request reads a seeded table whole.
+
+        With `index`, also assert one of the queries reads that index.
+        """
+        plans = self._plans(url, params)
+        self.assertTrue(plans)
+        if index is not None:
+            read = set().union(*(plan_indexes(plan) for _, plan in plans))
+            self.assertIn(index, read, '\n'.join(
+                f'{sql}\n{json.dumps(plan, indent=2)}' for sql, plan in plans
+            ))
+        for sql, plan in plans:
+            scanned = SEEDED_TABLES.intersection(table_scans(plan))
+            self.assertFalse(
+                scanned,
+                f'Full scan of {sorted(scanned)} for\n{sql}\n'
+                f'{json.dumps(plan, indent=2)}',
+            )
+
+    def test_post_list(self):
+        """Test the post list walks the (user, -id) index"""
+        self.assertIndexed(
+            reverse('blog:blog-list'), index=model_index(Blog, 'user', '-id'),
+        )
+
+    def test_post_list_relations(self):
+        """Test nested tags and sections are read through the link index"""
+        self.assertIndexed(
+            reverse('blog:blog-list'), {'expand': 'tags,sections'},
+        )
+
+    def test_featured_posts(self):
+        """Test featured posts read the partial featured index"""
+        self.assertIndexed(
+            reverse('blog:blog-list'), {'featured': 1},
+            index='core_blog_featured_idx',
+        )
+
+    def test_visible_posts(self):
+        """Test visible posts read their partial index, hidden (user, -id)"""
+        self.assertIndexed(
+            reverse('blog:blog-list'), {'visible': 1},
+            index='core_blog_visible_idx',
+        )
+        self.assertIndexed(
+            reverse('blog:blog-list'), {'visible': 0},
+            index=model_index(Blog, 'user', '-id'),
+        )
+
+    def test_tag_list(self):
+        """Test the tag list reads only the user's tags"""
+        self.assertIndexed(reverse('blog:tag-list'))
+
+    def test_section_list(self):
+        """Test the section list reads only the user's sections"""
+        self.assertIndexed(reverse('blog:section-list'))
+
+    def test_comment_list(self):
+        """Test the user's comments read the (user, -created_at) index"""
+        self.assertIndexed(
+            reverse('blog:comment-list'),
+            index=model_index(Comment, 'user', '-created_at', '-id'),
+        )
+
+    def test_reply_list(self):
+        """Test the user's replies read the (user, -created_at) index"""
+        self.assertIndexed(
+            reverse('blog:reply-list'),
+            index=model_index(Reply, 'user', '-created_at', '-id'),
+        )
+
+    def test_post_comments(self):
+        """Test a post's comments read the (post, -created_at) index"""
+        self.assertIndexed(
+            reverse('blog:post-comment-list', args=[self.post.pk]),
+            index=model_index(Comment, 'post', '-created_at', '-id'),
+        )
+
+    def test_post_threads(self):
+        """Test the thread window reads only the page's replies"""
+        self.assertIndexed(
+            reverse('blog:post-comment-thread', args=[self.post.pk]),
+        )
+
+    def test_comment_replies(self):
+        """Test a comment's replies read the (comment, created_at) index"""
+        self.assertIndexed(
+            reverse('blog:comment-reply-list', args=[self.comment.pk]),
+            index=model_index(Reply, 'comment', 'created_at'),
+        )
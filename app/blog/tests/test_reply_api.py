@@ -1,9 +1,13 @@
 """
 Tests for the replys API.
 """
+import inspect
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -12,8 +16,10 @@ from core.models import (
     Comment,
     Reply,
     Blog,
+    Tag,
 )
 
+from blog import serializers
 from blog.serializers import (
     ReplySerializer,
 )
@@ -32,6 +38,11 @@ def reply_like_url(reply_id):
     return reverse('blog:reply-like-reply', args=[reply_id])
 
 
+def comment_replies_url(comment_id):
+    """Create and return the reply list URL of a comment."""
+    return reverse('blog:comment-reply-list', args=[comment_id])
+
+
 def create_post(user, **params):
     """Create and return a sample post"""
     defaults = {
@@ -98,7 +109,7 @@ class PrivatereplyAPITests(TestCase):
         replies = Reply.objects.all().order_by('-created_at')
         serializer = ReplySerializer(replies, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_update_reply(self):
         """Test updating a reply"""
@@ -122,3 +133,148 @@ class PrivatereplyAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         replies = Reply.objects.filter(user=self.user)
         self.assertFalse(replies.exists())
+
+    def test_update_reply_comment_rejected(self):
+        """Test a reply cannot be moved to another comment"""
+        reply = Reply.objects.create(
+            user=self.user, comment=self.comment, body='body 1',
+        )
+        other = create_comment(user=self.user, post=self.post)
+
+        res = self.client.patch(detail_url(reply.id), {'comment': other.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('comment', res.data)
+        reply.refresh_from_db()
+        self.assertEqual(reply.comment, self.comment)
+
+    def test_create_reply_with_comment_id(self):
+        """Test creating a reply references its comment by id"""
+        payload = {'body': 'body', 'comment': self.comment.id}
+
+        res = self.client.post(REPLIES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['comment'], self.comment.id)
+
+    def test_create_reply_on_hidden_post_rejected(self):
+        """Test a reply to a comment on another user's hidden post fails"""
+        other = create_user(email='other@example.com', password='pass1234')
+        hidden = create_post(user=other, visible=False)
+        comment = create_comment(user=other, post=hidden)
+        payload = {'body': 'body', 'comment': comment.id}
+
+        res = self.client.post(REPLIES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('comment', res.data)
+        self.assertFalse(Reply.objects.filter(comment=comment).exists())
+
+
+class CommentReplyAPITests(TestCase):
+    """Test the replies endpoint of a single comment"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.other = create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.post = create_post(user=self.other)
+        self.post.tags.add(Tag.objects.create(user=self.other, name='tag'))
+        self.post.likes.add(self.other)
+        self.comment = Comment.objects.create(
+            user=self.other, post=self.post, body='comment',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _reply(self, user=None, body='reply'):
+        return Reply.objects.create(
+            user=user or self.user, comment=self.comment, body=body,
+        )
+
+    def test_list_replies_by_reference(self):
+        """Test every user's replies are listed with a comment id"""
+        self._reply(body='one')
+        self._reply(user=self.other, body='two')
+
+        res = self.client.get(comment_replies_url(self.comment.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual([reply['body'] for reply in results], ['two', 'one'])
+        self.assertEqual(results[0]['comment'], self.comment.id)
+
+    def test_depth_expands_parents(self):
+        """Test ?depth= embeds the comment, then its post"""
+        self._reply()
+        url = comment_replies_url(self.comment.id)
+
+        res = self.client.get(url, {'depth': 1})
+        comment = res.data['results'][0]['comment']
+        self.assertEqual(comment['body'], 'comment')
+        self.assertEqual(comment['post'], self.post.id)
+
+        res = self.client.get(url, {'depth': 2})
+        post = res.data['results'][0]['comment']['post']
+        self.assertEqual(post['title'], self.post.title)
+        # nested past MAX_NESTING_DEPTH, relations are ids only
+        self.assertEqual(post['tags'], [self.post.tags.get().id])
+
+    def test_depth_above_cap_error(self):
+        """Test a depth beyond the cap is rejected"""
+        url = comment_replies_url(self.comment.id)
+
+        for depth in [serializers.MAX_NESTING_DEPTH + 1, -1, 'x']:
+            res = self.client.get(url, {'depth': depth})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_independent_of_size(self):
+        """Test a fully expanded page costs the same for 1 or 10 replies"""
+        url = comment_replies_url(self.comment.id)
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(url, {'depth': 2})
+            return len(captured)
+
+        self._reply()
+        small = count_queries()
+        for i in range(9):
+            self._reply(user=self.other)
+
+        self.assertEqual(count_queries(), small)
+
+    def test_create_comment_reply(self):
+        """Test creating a reply takes the comment from the URL"""
+        res = self.client.post(
+            comment_replies_url(self.comment.id), {'body': 'hello'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        reply = Reply.objects.get(id=res.data['id'])
+        self.assertEqual(reply.comment, self.comment)
+        self.assertEqual(reply.user, self.user)
+
+    def test_hidden_post_replies_not_found(self):
+        """Test replies under another user's hidden post are not found"""
+        Blog.objects.filter(id=self.post.id).update(visible=False)
+
+        res = self.client.get(comment_replies_url(self.comment.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_every_serializer_capped(self):
+        """Test every serializer in the module enforces the nesting cap"""
+        for name, member in inspect.getmembers(serializers, inspect.isclass):
+            if (
+                issubclass(member, serializers.serializers.BaseSerializer)
+                and member.__module__ == serializers.__name__
+            ):
+                self.assertTrue(
+                    issubclass(member, serializers.NestingMixin), name,
+                )
@@ -0,0 +1,126 @@
+"""
+Tests for the post search API
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Section,
+)
+
+
+SEARCH_URL = reverse('blog:blog-search')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class SearchAPITests(TestCase):
+    """Test full-text search over posts."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _ids(self, res):
+        return [item['id'] for item in res.data['results']]
+
+    def test_query_required(self):
+        """Test searching without text is rejected."""
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_title_ranked_above_detail(self):
+        """Test title matches outrank detail matches."""
+        in_detail = Blog.objects.create(
+            user=self.user, title='Pastry', detail='Baking volcanoes',
+        )
+        in_title = Blog.objects.create(
+            user=self.user, title='Volcanoes', detail='Lava and ash',
+        )
+        Blog.objects.create(user=self.user, title='Gardens', detail='Roses')
+
+        res = self.client.get(SEARCH_URL, {'q': 'volcano'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._ids(res), [in_title.id, in_detail.id])
+        self.assertIn('<mark>', res.data['results'][0]['title_highlight'])
+
+    def test_highlights_escape_html(self):
+        """Test stored markup is escaped and only <mark> is added."""
+        Blog.objects.create(
+            user=self.user,
+            title='<script>alert(1)</script> volcano',
+            detail='<img src=x onerror="alert(1)"> volcano & ash',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'volcano'})
+
+        item = res.data['results'][0]
+        self.assertEqual(
+            item['title_highlight'],
+            '&lt;script&gt;alert(1)&lt;/script&gt; <mark>volcano</mark>',
+        )
+        self.assertNotIn('<img', item['detail_highlight'])
+        self.assertIn('&quot;alert(1)&quot;', item['detail_highlight'])
+        self.assertIn('<mark>volcano</mark> &amp; ash',
+                      item['detail_highlight'])
+
+    def test_section_text_indexed(self):
+        """Test section headers and descriptions are searchable."""
+        post = Blog.objects.create(user=self.user, title='Trip')
+        section = Section.objects.create(
+            user=self.user, header='Day one', description='glaciers',
+        )
+        post.sections.add(section)
+
+        res = self.client.get(SEARCH_URL, {'q': 'glacier'})
+        self.assertEqual(self._ids(res), [post.id])
+
+        section.description = 'beaches'
+        section.save()
+        res = self.client.get(SEARCH_URL, {'q': 'glacier'})
+        self.assertEqual(self._ids(res), [])
+
+        section.delete()
+        res = self.client.get(SEARCH_URL, {'q': 'beach'})
+        self.assertEqual(self._ids(res), [])
+
+    def test_search_limited_to_user(self):
+        """Test other users' posts are not searched."""
+        other = create_user(email='other@example.com', password='pass1234')
+        Blog.objects.create(user=other, title='Volcanoes')
+
+        res = self.client.get(SEARCH_URL, {'q': 'volcano'})
+
+        self.assertEqual(self._ids(res), [])
+
+    def test_results_keyset_paginated(self):
+        """Test search results are paged by rank without gaps."""
+        posts = [
+            Blog.objects.create(
+                user=self.user, title='Volcano', detail='volcano ' * i,
+            )
+            for i in range(5)
+        ]
+
+        res = self.client.get(SEARCH_URL, {'q': 'volcano', 'page_size': 2})
+        ids = self._ids(res)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += self._ids(res)
+
+        self.assertEqual(sorted(ids), sorted(post.id for post in posts))
+        self.assertEqual(len(ids), len(set(ids)))
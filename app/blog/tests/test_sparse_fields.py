@@ -0,0 +1,183 @@
+"""
+Tests for sparse fieldsets and relation expansion on the blog APIs
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blog,
+    Comment,
+    Section,
+    Tag,
+)
+
+
+BLOG_URL = reverse('blog:blog-list')
+
+
+def detail_url(blog_id):
+    """Create and return a blog detail URL."""
+    return reverse('blog:blog-detail', args=[blog_id])
+
+
+def post_comments_url(post_id):
+    """Create and return the comments URL of a post."""
+    return reverse('blog:post-comment-list', args=[post_id])
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class SparseFieldsTests(TestCase):
+    """Test the fields and expand query parameters."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Blog.objects.create(user=self.user, title='post')
+        self.post.tags.add(Tag.objects.create(user=self.user, name='tag'))
+        self.post.sections.add(
+            Section.objects.create(user=self.user, header='header'),
+        )
+        self.post.likes.add(self.user)
+
+    def test_default_renders_every_field(self):
+        """Test omitting both parameters keeps the full representation."""
+        res = self.client.get(detail_url(self.post.id))
+
+        self.assertIn('detail', res.data)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(len(res.data['likes']), 1)
+
+    def test_fields_restricts_list(self):
+        """Test ?fields= returns only the listed fields without relations."""
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(BLOG_URL)
+        with CaptureQueriesContext(connection) as sparse:
+            res = self.client.get(BLOG_URL, {'fields': 'id,title,created_at'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(res.data['results'][0]), {'id', 'title', 'created_at'},
+        )
+        # neither tags nor sections are prefetched
+        self.assertEqual(len(sparse), len(full) - 2)
+
+    def test_expand_embeds_only_listed_relations(self):
+        """Test ?expand= keeps scalar fields and the listed relations."""
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(
+                detail_url(self.post.id), {'expand': 'sections'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['sections'][0]['header'], 'header')
+        self.assertIn('title', res.data)
+        self.assertNotIn('tags', res.data)
+        self.assertNotIn('likes', res.data)
+        sql = ' '.join(query['sql'] for query in captured)
+        self.assertNotIn('core_blog_tags', sql)
+        self.assertNotIn('core_blog_likes', sql)
+
+    def test_fields_with_expand(self):
+        """Test an expanded relation is added to the sparse fieldset."""
+        res = self.client.get(
+            BLOG_URL, {'fields': 'id', 'expand': 'tags'},
+        )
+
+        self.assertEqual(set(res.data['results'][0]), {'id', 'tags'})
+
+    def test_unknown_field_error(self):
+        """Test unknown fields and relations are rejected."""
+        res = self.client.get(BLOG_URL, {'fields': 'id,password'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(BLOG_URL, {'expand': 'title'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expand_likes_on_detail_only(self):
+        """Test likes expand on the detail, which is the one rendering them."""
+        res = self.client.get(detail_url(self.post.id), {'expand': 'likes'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['likes'][0]['id'], self.user.id)
+        self.assertNotIn('tags', res.data)
+
+        res = self.client.get(BLOG_URL, {'expand': 'likes'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
+
+    def test_fields_on_attribute_endpoints(self):
+        """Test ?fields= applies to the tag, section and comment APIs."""
+        Comment.objects.create(user=self.user, post=self.post, body='body')
+        for url in (
+            reverse('blog:tag-list'),
+            reverse('blog:section-list'),
+            reverse('blog:comment-list'),
+            post_comments_url(self.post.id),
+        ):
+            res = self.client.get(url, {'fields': 'id'})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+            # tags and sections are not paginated
+            items = res.data['results'] if 'results' in res.data else res.data
+            self.assertEqual(items[0].keys(), {'id'}, url)
+
+        res = self.client.get(reverse('blog:comment-list'), {'fields': 'nope'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expand_thread_replies(self):
+        """Test the comment thread leaves replies out unless expanded."""
+        Comment.objects.create(user=self.user, post=self.post, body='body')
+        url = reverse('blog:post-comment-thread', args=[self.post.id])
+
+        res = self.client.get(url, {'expand': ''})
+        self.assertNotIn('replies', res.data['results'][0])
+        self.assertIn('reply_count', res.data['results'][0])
+
+        res = self.client.get(url, {'expand': 'replies'})
+        self.assertEqual(res.data['results'][0]['replies'], [])
+
+    def test_fields_do_not_restrict_writes(self):
+        """Test ?fields= shapes the response but not the accepted input."""
+        res = self.client.patch(
+            f'{detail_url(self.post.id)}?fields=id',
+            {'title': 'new title', 'tags': [{'name': 'new tag'}]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'id': self.post.id})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'new title')
+        self.assertEqual(self.post.tags.get().name, 'new tag')
+
+    def test_unknown_field_rejected_before_write(self):
+        """Test a bad ?fields= or ?expand= fails before anything is saved."""
+        res = self.client.post(
+            f'{BLOG_URL}?fields=nope',
+            {'title': 'created'},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Blog.objects.filter(title='created').exists())
+
+        res = self.client.patch(
+            f'{detail_url(self.post.id)}?expand=title',
+            {'title': 'new title'},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'post')
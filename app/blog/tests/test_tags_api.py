@@ -87,6 +87,14 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_get_tag_detail_not_allowed(self):
+        """Test tags have no retrieve action."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(detail_url(tag.id))
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name='Breakfast')
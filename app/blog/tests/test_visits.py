@@ -0,0 +1,120 @@
+"""
+Tests for buffered post visit counting
+"""
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Blog
+
+from blog.visits import VisitBuffer
+
+
+def detail_url(blog_id):
+    """Create and return a blog detail URL."""
+    return reverse('blog:blog-detail', args=[blog_id])
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class VisitBufferTests(TestCase):
+    """Test the write-behind visit buffer."""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.post = Blog.objects.create(user=self.user, title='post')
+
+    def test_visits_buffered_until_flush(self):
+        """Test recording visits does not write until flushed."""
+        buffer = VisitBuffer(interval=3600, threshold=100)
+        for _ in range(3):
+            buffer.record(self.post.id)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.visit_count, 0)
+
+        flushed = buffer.flush()
+
+        self.post.refresh_from_db()
+        self.assertEqual(flushed, 1)
+        self.assertEqual(self.post.visit_count, 3)
+
+    def test_threshold_triggers_flush(self):
+        """Test reaching the threshold writes visits in one update."""
+        other = Blog.objects.create(user=self.user, title='other')
+        buffer = VisitBuffer(interval=3600, threshold=3)
+        buffer.record(self.post.id)
+        buffer.record(other.id)
+
+        with self.assertNumQueries(2):
+            buffer.record(self.post.id)
+
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.post.visit_count, 2)
+        self.assertEqual(other.visit_count, 1)
+
+    def test_interval_triggers_flush(self):
+        """Test visits are flushed once the interval has passed."""
+        buffer = VisitBuffer(interval=0, threshold=100)
+        buffer.record(self.post.id)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.visit_count, 1)
+
+    @override_settings(BLOG_COUNT_VISITS=True)
+    def test_retrieve_records_visit(self):
+        """Test retrieving a post records a visit."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with patch('blog.views.visit_buffer') as buffer:
+            client.get(detail_url(self.post.id))
+
+        buffer.record.assert_called_once_with(self.post.id)
+
+    def test_retrieve_without_counting(self):
+        """Test no visit is recorded while counting is off."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with override_settings(BLOG_COUNT_VISITS=False), \
+                patch('blog.views.visit_buffer') as buffer:
+            client.get(detail_url(self.post.id))
+
+        buffer.record.assert_not_called()
+
+
+class VisitBufferTimerTests(TransactionTestCase):
+    """Test visits pending on an idle worker are written back."""
+
+    def test_timer_flushes_idle_buffer(self):
+        """Test the interval flush runs without further visits."""
+        user = create_user(email='user@example.com', password='testpass123')
+        post = Blog.objects.create(user=user, title='post')
+        buffer = VisitBuffer(interval=0.1, threshold=100)
+
+        buffer.record(post.id)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            post.refresh_from_db()
+            if post.visit_count:
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(post.visit_count, 1)
@@ -0,0 +1,61 @@
+"""
+Comment threads: each comment with its first replies and reply count
+"""
+from django.db.models import (
+    Count,
+    F,
+    Window,
+)
+from django.db.models.functions import RowNumber
+
+from core.models import Reply
+
+
+DEFAULT_THREAD_REPLIES = 3
+MAX_THREAD_REPLIES = 20
+
+
+def load_threads(comments, limit, newest=False):
+    """Attach `thread_replies` and `reply_count` to every comment.
+
+    One query ranks the replies of all the comments with ROW_NUMBER
+    partitioned by comment, counts them with a windowed COUNT, and keeps
+    the first `limit` of each, oldest or newest first. The ranking reads
+    the (comment, created_at) index.
+    """
+    comments = list(comments)
+    for comment in comments:
+        comment.thread_replies = []
+        comment.reply_count = 0
+    if not comments:
+        return comments
+
+    if newest:
+        order = [F('created_at').desc(), F('id').desc()]
+    else:
+        order = [F('created_at').asc(), F('id').asc()]
+    ranked = Reply.objects.filter(
+        comment_id__in=[comment.pk for comment in comments],
+    ).annotate(
+        position=Window(
+            RowNumber(), partition_by=[F('comment_id')], order_by=order,
+        ),
+        total=Window(Count('id'), partition_by=[F('comment_id')]),
+    ).order_by()
+    sql, params = ranked.query.sql_with_params()
+    # a window result can only be filtered from an enclosing query
+    replies = Reply.objects.raw(
+        f'SELECT * FROM ({sql}) AS ranked WHERE position <= %s '
+        f'ORDER BY comment_id, position',
+        # the first reply carries the count even when none are returned
+        [*params, max(limit, 1)],
+    )
+
+    by_id = {comment.pk: comment for comment in comments}
+    for reply in replies:
+        comment = by_id[reply.comment_id]
+        comment.reply_count = reply.total
+        if reply.position <= limit:
+            comment.thread_replies.append(reply)
+
+    return comments
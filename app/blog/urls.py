@@ -16,7 +16,17 @@ router.register('post', views.BlogViewSet)
 router.register('tag', views.TagViewSet)
 router.register('section', views.SectionViewSet)
 router.register('comment', views.CommentViewSet)
+router.register(
+    r'post/(?P<post_pk>\d+)/comments',
+    views.PostCommentViewSet,
+    basename='post-comment',
+)
 router.register('reply', views.ReplyViewSet)
+router.register(
+    r'comment/(?P<comment_pk>\d+)/replies',
+    views.CommentReplyViewSet,
+    basename='comment-reply',
+)
 
 app_name = 'blog'
 
@@ -12,6 +12,7 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from drf_spectacular.utils import (
@@ -21,6 +22,18 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    F,
+    Prefetch,
+    Q,
+)
+from django.utils import timezone
+from django.http import (
+    Http404,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 
 from core.models import (
@@ -30,75 +43,222 @@ from core.models import (
     Comment,
     Reply,
 )
+from core.renderers import (
+    FastJSONRenderer,
+    NDJSONRenderer,
+)
 from blog import serializers
+from blog.cache import CachedResponseMixin
+from blog.conditional import ConditionalGetMixin
+from blog.fastpath import (
+    ValuesListMixin,
+    ValuesSerializer,
+)
+from blog.filters import PostFilterBackend
+from blog.visits import visit_buffer
+from blog.pagination import (
+    PostPagination,
+    CreatedAtPagination,
+    SearchPagination,
+)
+from blog.search import search_posts
+from blog.threads import (
+    DEFAULT_THREAD_REPLIES,
+    MAX_THREAD_REPLIES,
+    load_threads,
+)
+from blog.signals import invalidate_posts
+
+
+def sparse_field_parameters(serializer_class):
+    """Return the ?fields= and ?expand= parameters a serializer accepts."""
+    parameters = [
+        OpenApiParameter(
+            'fields',
+            OpenApiTypes.STR,
+            description='Comma separated list of fields to return.',
+        ),
+    ]
+    if serializer_class.expandable_fields:
+        relations = ', '.join(serializer_class.expandable_fields)
+        parameters.append(OpenApiParameter(
+            'expand',
+            OpenApiTypes.STR,
+            description=f'Comma separated list of relations ({relations}) '
+                        'to embed. Relations not listed are left out.',
+        ))
+
+    return parameters
+
+
+POST_PARAMETERS = sparse_field_parameters(serializers.BlogSerializer)
+POST_DETAIL_PARAMETERS = sparse_field_parameters(
+    serializers.BlogDetailSerializer,
+)
+
 
 @extend_schema_view(
-    list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma seperated list of tag IDs to filter',
-            ),
-            OpenApiParameter(
-                'sections',
-                OpenApiTypes.STR,
-                description='Comma seperated list of section IDs to filter',
-            )
-        ]
-    )
+    list=extend_schema(parameters=POST_PARAMETERS),
+    retrieve=extend_schema(parameters=POST_DETAIL_PARAMETERS),
+    create=extend_schema(parameters=POST_DETAIL_PARAMETERS),
+    update=extend_schema(parameters=POST_DETAIL_PARAMETERS),
+    partial_update=extend_schema(parameters=POST_DETAIL_PARAMETERS),
 )
-class BlogViewSet(viewsets.ModelViewSet):
+class BlogViewSet(ConditionalGetMixin,
+                  CachedResponseMixin,
+                  ValuesListMixin,
+                  viewsets.ModelViewSet):
     """View for managing auth blog APIs"""
     serializer_class = serializers.BlogDetailSerializer
     queryset = Blog.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
-
-    def _paramts_to_ints(self, qs):
-        """Convert a list of strings to integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = PostPagination
+    filter_backends = [PostFilterBackend]
+    # posts rendered per batch of relation queries by the export
+    export_chunk_size = 500
+    # nested relations rendered by the serializer of each action; list
+    # and export render values() rows, loading relations per page instead
+    prefetch_map = {
+        'retrieve': ['tags', 'sections', 'likes'],
+        'search': ['tags', 'sections'],
+    }
 
     def get_queryset(self):
         """Retrieve posts for users"""
-        tags = self.request.query_params.get('tags')
         queryset = self.queryset
-        if tags:
-            tags_ids = self._paramts_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
+        prefetch = self.prefetch_map.get(self.action, [])
+        if prefetch:
+            # skip the relations this request leaves out of the response
+            rendered = self.get_serializer_class().get_rendered_fields(
+                self.request,
+            )
+            prefetch = [name for name in prefetch if name in rendered]
+        if prefetch:
+            # relations in id order, as the values() list renders them
+            queryset = queryset.prefetch_related(*(
+                Prefetch(name, queryset=Blog._meta.get_field(
+                    name
+                ).related_model.objects.order_by('id'))
+                for name in prefetch
+            ))
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-id').distinct()
+        ).order_by('-id')
 
     def get_serializer_class(self):
         """Return the serializer class for the request, obsolete function"""
-        if self.action == 'list':
+        if self.action in ('list', 'export'):
             return serializers.BlogSerializer
         elif self.action == 'like_post':
             return serializers.BlogLikeSerializer
+        elif self.action == 'search':
+            return serializers.BlogSearchSerializer
 
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a post and count the visit."""
+        response = super().retrieve(request, *args, **kwargs)
+        if settings.BLOG_COUNT_VISITS and response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED,
+        ):
+            visit_buffer.record(int(self.kwargs['pk']))
+
+        return response
+
     def perform_create(self, serializer):
         """Create a new post."""
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                required=True,
+                description='Search text, in web search syntax',
+            ),
+            *POST_PARAMETERS,
+        ],
+    )
+    @action(
+        methods=['GET'], detail=False, url_path='search',
+        pagination_class=SearchPagination,
+    )
+    def search(self, request):
+        """Search posts by title, detail and section text"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response(
+                {'q': ['This query parameter is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = search_posts(
+            self.filter_queryset(self.get_queryset()), text,
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(
+        parameters=POST_PARAMETERS,
+        responses={
+            (200, NDJSONRenderer.media_type): serializers.BlogSerializer,
+        },
+    )
+    @action(
+        methods=['GET'], detail=False, url_path='export',
+        renderer_classes=[FastJSONRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        """Stream every post as newline delimited JSON"""
+        serializer = ValuesSerializer(self.get_serializer())
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        # a server-side cursor, so memory is bound by the chunk size
+        rows = serializer.get_values(queryset).iterator(
+            chunk_size=self.export_chunk_size,
+        )
+        items = serializer.iter_representation(rows, self.export_chunk_size)
+
+        response = StreamingHttpResponse(
+            NDJSONRenderer().render_lines(items),
+            content_type=NDJSONRenderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="posts.ndjson"'
+        )
+        return response
+
+    @extend_schema(request=None)
     @action(methods=['POST'], detail=True, url_path='like-post')
     def like_post(self, request, pk=None):
         """Like or remove like from a post"""
-        post = self.get_object()
-        serializer = self.get_serializer(post, data=request.data)
+        try:
+            post_id = int(pk)
+        except ValueError:
+            raise Http404
+        result = Blog.objects.toggle_like(
+            post_id, user_id=request.user.id, owner_id=request.user.id,
+        )
+        if result is None:
+            raise Http404
+        # the raw statement sends no m2m_changed, so evict explicitly
+        invalidate_posts([post_id])
 
-        if serializer.is_valid():
-            if post.likes.filter(id=request.user.id).exists():
-                post.likes.remove(request.user)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            else:
-                post.likes.add(request.user)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        liked, like_count = result
+        serializer = self.get_serializer({
+            'liked': liked,
+            'like_count': like_count,
+        })
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+# ?fields= of the serializers without expandable relations
+FIELD_PARAMETERS = sparse_field_parameters(serializers.BaseModelSerializer)
 
 
 @extend_schema_view(
@@ -108,26 +268,58 @@ class BlogViewSet(viewsets.ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to posts.',
-            )
+            ),
+            *FIELD_PARAMETERS,
         ]
-    )
+    ),
+    update=extend_schema(parameters=FIELD_PARAMETERS),
+    partial_update=extend_schema(parameters=FIELD_PARAMETERS),
 )
-class BaseAttrViewSet(mixins.UpdateModelMixin,
-                            mixins.DestroyModelMixin,
-                            mixins.ListModelMixin,
-                            viewsets.GenericViewSet):
+class BaseAttrViewSet(ConditionalGetMixin,
+                      CachedResponseMixin,
+                      mixins.UpdateModelMixin,
+                      mixins.DestroyModelMixin,
+                      mixins.ListModelMixin,
+                      viewsets.GenericViewSet):
     """Base viewset for attributes."""
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
     order_name = 'name'  # default ordering
+    post_relation = None  # Blog relation embedding this model, if any
+
+    def _assigned_only(self):
+        return bool(int(self.request.query_params.get('assigned_only', 0)))
+
+    def get_version_fields(self):
+        """Include linked posts, which decide assigned_only membership."""
+        if self._assigned_only():
+            return self.version_fields + ['blog__updated_at']
+
+        return self.version_fields
+
+    def _touch_posts(self, instance):
+        """Bump the version of posts that embed this instance."""
+        if self.post_relation is not None:
+            Blog.objects.filter(
+                **{self.post_relation: instance}
+            ).update(updated_at=timezone.now())
+
+    def perform_update(self, serializer):
+        """Update the instance and the posts embedding it."""
+        with transaction.atomic():
+            instance = serializer.save()
+            self._touch_posts(instance)
+
+    def perform_destroy(self, instance):
+        """Delete the instance and bump the posts embedding it."""
+        with transaction.atomic():
+            self._touch_posts(instance)
+            instance.delete()
 
     def get_queryset(self):
         """Filter queryset to authenticated or read only user."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
         queryset = self.queryset
-        if assigned_only:
+        if self._assigned_only():
             queryset = queryset.filter(blog__isnull=False)
 
         return queryset.filter(
@@ -139,6 +331,7 @@ class TagViewSet(BaseAttrViewSet):
     """View for managing tags in the database"""
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
+    post_relation = 'tags'
 
 
 class SectionViewSet(BaseAttrViewSet):
@@ -146,6 +339,7 @@ class SectionViewSet(BaseAttrViewSet):
     serializer_class = serializers.SectionSerializer
     queryset = Section.objects.all()
     order_name = 'header'
+    post_relation = 'sections'
 
     def get_serializer_class(self):
         """Return the serializer class for the section request"""
@@ -169,15 +363,235 @@ class SectionViewSet(BaseAttrViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def save_comment(serializer, **kwargs):
+    """Create a comment and count it on its post."""
+    with transaction.atomic():
+        comment = serializer.save(**kwargs)
+        Blog.objects.filter(pk=comment.post_id).update(
+            comment_count=F('comment_count') + 1,
+            updated_at=timezone.now(),
+        )
+
+
 class CommentViewSet(BaseAttrViewSet, mixins.CreateModelMixin):
     """View for managing comments in the database."""
     serializer_class = serializers.CommentSerializer
+    pagination_class = CreatedAtPagination
     order_name = 'created_at'
     queryset = Comment.objects.all()
 
+    def perform_create(self, serializer):
+        """Create a comment and count it on its post."""
+        save_comment(serializer, user=self.request.user)
+
+    def perform_destroy(self, instance):
+        """Delete a comment and uncount it on its post."""
+        with transaction.atomic():
+            Blog.objects.filter(pk=instance.post_id).update(
+                comment_count=F('comment_count') - 1,
+                updated_at=timezone.now(),
+            )
+            instance.delete()
+
+
+DEPTH_PARAMETERS = [
+    OpenApiParameter(
+        'depth',
+        OpenApiTypes.INT,
+        enum=list(range(serializers.MAX_NESTING_DEPTH + 1)),
+        description='Levels of parents to embed instead of their ids.',
+    ),
+]
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=DEPTH_PARAMETERS + FIELD_PARAMETERS),
+    retrieve=extend_schema(parameters=DEPTH_PARAMETERS + FIELD_PARAMETERS),
+    create=extend_schema(parameters=FIELD_PARAMETERS),
+)
+class ChildViewSet(ConditionalGetMixin,
+                   CachedResponseMixin,
+                   mixins.ListModelMixin,
+                   mixins.RetrieveModelMixin,
+                   mixins.CreateModelMixin,
+                   viewsets.GenericViewSet):
+    """Base viewset for the children of the object given in the URL.
+
+    Every user's children are listed, as long as the parent is visible
+    to the requesting user. `?depth=` embeds the parents of each child.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CreatedAtPagination
+    parent_field = None  # foreign key to the parent, named in the URL
+    # (select_related, prefetch_related) for each ?depth= level
+    depth_related = []
+    # version stamps of the parent embedded at each ?depth= level
+    depth_version_fields = []
+
+    def get_parent_queryset(self):
+        """Return the parents visible to the user."""
+        raise NotImplementedError
+
+    def get_parent(self):
+        """Return the parent in the URL, or raise 404."""
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.get_parent_queryset(),
+                pk=self.kwargs[f'{self.parent_field}_pk'],
+            )
+
+        return self._parent
+
+    def get_depth(self):
+        return serializers.parse_depth(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['depth'] = self.get_depth()
+        return context
+
+    def get_version_fields(self):
+        depth = self.get_depth()
+        return self.version_fields + self.depth_version_fields[:depth]
+
+    def get_queryset(self):
+        """Return every user's children of the parent."""
+        queryset = self.queryset.filter(
+            **{self.parent_field: self.get_parent()}
+        )
+        for related, prefetch in self.depth_related[:self.get_depth()]:
+            queryset = queryset.select_related(related).prefetch_related(
+                *prefetch
+            )
+
+        return queryset.order_by('-created_at', '-id')
+
+    def get_parent_scopes(self):
+        """Return the cache scopes of the parents a response embeds."""
+        return []
+
+    def get_cache_scopes(self):
+        parent_pk = self.kwargs[f'{self.parent_field}_pk']
+        scopes = [f'{self.basename}-list:{parent_pk}']
+        scopes += self.get_parent_scopes()
+        if self.action == 'retrieve':
+            model_name = self.queryset.model._meta.model_name
+            scopes.append(f'{model_name}:{self.kwargs["pk"]}')
+
+        return scopes
+
+    def perform_create(self, serializer):
+        """Create a child of the parent in the URL."""
+        serializer.save(
+            user=self.request.user,
+            **{self.parent_field: self.get_parent()},
+        )
+
+
+class PostCommentViewSet(ChildViewSet):
+    """View for reading and adding the comments of one post."""
+    serializer_class = serializers.PostCommentSerializer
+    queryset = Comment.objects.all()
+    parent_field = 'post'
+    depth_related = [('post', ['post__tags', 'post__sections'])]
+    depth_version_fields = ['post__updated_at']
+
+    def get_parent_queryset(self):
+        return Blog.objects.filter(
+            Q(visible=True) | Q(user_id=self.request.user.pk),
+        ).only('id')
+
+    def get_parent_scopes(self):
+        # the post may become hidden, or be embedded at depth 1
+        return [f'blog:{self.kwargs["post_pk"]}']
+
+    def get_serializer_class(self):
+        if self.action == 'thread':
+            return serializers.ThreadCommentSerializer
+
+        return self.serializer_class
+
+    def perform_create(self, serializer):
+        """Create a comment on the post and count it."""
+        save_comment(
+            serializer, user=self.request.user, post=self.get_parent(),
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'replies',
+                OpenApiTypes.INT,
+                description='Replies returned per comment, at most '
+                            f'{MAX_THREAD_REPLIES} '
+                            f'(default {DEFAULT_THREAD_REPLIES}).',
+            ),
+            OpenApiParameter(
+                'order',
+                OpenApiTypes.STR,
+                enum=['oldest', 'newest'],
+                description='Return the oldest (default) or newest replies.',
+            ),
+            *DEPTH_PARAMETERS,
+            *sparse_field_parameters(serializers.ThreadCommentSerializer),
+        ],
+    )
+    @action(methods=['GET'], detail=False, url_path='thread')
+    def thread(self, request, post_pk=None):
+        """List comments, each with its first replies and reply count"""
+        try:
+            limit = int(request.query_params.get(
+                'replies', DEFAULT_THREAD_REPLIES,
+            ))
+        except ValueError:
+            limit = -1
+        if not 0 <= limit <= MAX_THREAD_REPLIES:
+            raise ValidationError({'replies': [
+                f'Expected an integer from 0 to {MAX_THREAD_REPLIES}.'
+            ]})
+        order = request.query_params.get('order', 'oldest')
+        if order not in ('oldest', 'newest'):
+            raise ValidationError({'order': ['Expected oldest or newest.']})
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        comments = load_threads(page, limit, newest=order == 'newest')
+        serializer = self.get_serializer(comments, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+
+class CommentReplyViewSet(ChildViewSet):
+    """View for reading and adding the replies of one comment."""
+    serializer_class = serializers.CommentReplySerializer
+    queryset = Reply.objects.all()
+    parent_field = 'comment'
+    depth_related = [
+        ('comment', []),
+        ('comment__post', ['comment__post__tags', 'comment__post__sections']),
+    ]
+    depth_version_fields = ['comment__updated_at', 'comment__post__updated_at']
+
+    def get_parent_queryset(self):
+        return Comment.objects.filter(
+            Q(post__visible=True) | Q(post__user_id=self.request.user.pk),
+        ).only('id', 'post_id')
+
+    def get_parent_scopes(self):
+        return [
+            f'comment:{self.kwargs["comment_pk"]}',
+            f'blog:{self.get_parent().post_id}',
+        ]
+
 
 class ReplyViewSet(BaseAttrViewSet, mixins.CreateModelMixin):
     """View for managing replies in the database."""
     serializer_class = serializers.ReplySerializer
+    pagination_class = CreatedAtPagination
     order_name = 'created_at'
     queryset = Reply.objects.all()
+
+    def perform_create(self, serializer):
+        """Create a reply owned by the requester."""
+        serializer.save(user=self.request.user)
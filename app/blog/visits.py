@@ -0,0 +1,99 @@
+"""
+Buffered visit counting for blog posts
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    connection,
+)
+from django.db.models import F
+
+from core.models import Blog
+
+
+logger = logging.getLogger(__name__)
+
+
+class VisitBuffer:
+    """Per-worker accumulator of post visits, written back in batches.
+
+    Pending visits are flushed once `threshold` of them pile up or
+    `interval` seconds have passed since the last flush, and once more
+    when the worker shuts down gracefully. A timer flushes visits left
+    pending on a worker that goes idle. A crashed worker loses at most
+    `threshold` visits.
+    """
+
+    def __init__(self, interval, threshold):
+        self.interval = interval
+        self.threshold = threshold
+        self._pending = Counter()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def record(self, post_id):
+        """Count one visit of a post, flushing if a bound is reached."""
+        with self._lock:
+            self._pending[post_id] += 1
+            self._size += 1
+            due = (
+                self._size >= self.threshold
+                or time.monotonic() - self._last_flush >= self.interval
+            )
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_idle)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _flush_idle(self):
+        """Flush from the timer thread, once no request did."""
+        try:
+            self.flush()
+        finally:
+            # the timer thread opened a database connection of its own
+            connection.close()
+
+    def flush(self):
+        """Write pending visits back, one UPDATE per post."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._size = 0
+            self._last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        # a stable order keeps concurrent flushes from deadlocking
+        remaining = sorted(pending.items())
+        try:
+            while remaining:
+                post_id, visits = remaining[0]
+                Blog.objects.filter(id=post_id).update(
+                    visit_count=F('visit_count') + visits,
+                )
+                remaining.pop(0)
+        except DatabaseError:
+            logger.exception('Failed to flush %d post visits', len(remaining))
+            with self._lock:
+                for post_id, visits in remaining:
+                    self._pending[post_id] += visits
+                    self._size += visits
+
+        return len(pending) - len(remaining)
+
+
+visit_buffer = VisitBuffer(
+    interval=settings.BLOG_VISIT_FLUSH_INTERVAL,
+    threshold=settings.BLOG_VISIT_FLUSH_THRESHOLD,
+)
+atexit.register(visit_buffer.flush)
@@ -0,0 +1,65 @@
+"""
+Per-route query count and latency budgets, declared in budgets.json
+"""
+import json
+import os
+
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), 'budgets.json')
+
+
+def load_budget(path=BUDGET_PATH):
+    """Return the budget file as a dict."""
+    with open(path) as budget_file:
+        return json.load(budget_file)
+
+
+def compare(routes, measured, latency_scale=1.0):
+    """Return one row per route, holding the budget and the measurement.
+
+    `measured` maps route names to {'queries': ..., 'ms': ...}. The
+    latency ceilings are multiplied by `latency_scale`, so slower
+    machines can stretch them without touching the file.
+    """
+    rows = []
+    for name, budget in routes.items():
+        result = measured[name]
+        max_ms = budget['max_ms'] * latency_scale
+        rows.append({
+            'route': name,
+            'queries': result['queries'],
+            'max_queries': budget['max_queries'],
+            'ms': result['ms'],
+            'max_ms': max_ms,
+            'over': (
+                result['queries'] > budget['max_queries']
+                or result['ms'] > max_ms
+            ),
+        })
+
+    return rows
+
+
+def format_table(rows):
+    """Return the rows as a text table with the excess of each route."""
+    header = ('route', 'queries', 'budget', 'diff', 'ms', 'budget', 'diff', '')
+    lines = [header]
+    for row in rows:
+        lines.append((
+            row['route'],
+            str(row['queries']),
+            str(row['max_queries']),
+            f'{row["queries"] - row["max_queries"]:+d}',
+            f'{row["ms"]:.1f}',
+            f'{row["max_ms"]:.1f}',
+            f'{row["ms"] - row["max_ms"]:+.1f}',
+            'OVER' if row['over'] else 'ok',
+        ))
+
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return '\n'.join(
+        '  '.join(
+            cell.ljust(width) for cell, width in zip(line, widths)
+        ).rstrip()
+        for line in lines
+    )
@@ -0,0 +1,338 @@
+"""
+Mixed read/write load tests against the API, run with `manage.py loadtest`
+"""
+import http.client
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application,
+)
+from django.db import connections
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Blog,
+    Comment,
+)
+from core.seeding import seed_emails
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_dataset(prefix):
+    """Return the tokens and ids the scenario picks from."""
+    tokens = dict(
+        Token.objects.filter(
+            **{f'user__{key}': value for key, value in
+               seed_emails(prefix).items()}
+        ).values_list('user_id', 'key')
+    )
+    if not tokens:
+        raise ValueError(f'No users seeded under {prefix!r}.')
+
+    own_posts = {}
+    visible_posts = []
+    for post_id, user_id, visible in Blog.objects.filter(
+        user_id__in=tokens,
+    ).values_list('id', 'user_id', 'visible').order_by('id'):
+        own_posts.setdefault(user_id, []).append(post_id)
+        if visible:
+            visible_posts.append(post_id)
+    comments = list(
+        Comment.objects.filter(
+            post_id__in=visible_posts,
+        ).values_list('id', flat=True).order_by('id')
+    )
+
+    return {
+        'users': sorted(tokens),
+        'tokens': tokens,
+        'own_posts': own_posts,
+        'visible_posts': visible_posts,
+        'comments': comments,
+    }
+
+
+def _own_post(rng, dataset, user):
+    posts = dataset['own_posts'].get(user)
+    return rng.choice(posts) if posts else None
+
+
+def _visible_post(rng, dataset, user):
+    posts = dataset['visible_posts']
+    return rng.choice(posts) if posts else None
+
+
+def _comment(rng, dataset, user):
+    comments = dataset['comments']
+    return rng.choice(comments) if comments else None
+
+
+# name: (weight, method, URL name, picks the URL argument, body)
+SCENARIO = {
+    'post-list': (25, 'GET', 'blog:blog-list', None, None),
+    'post-detail': (15, 'GET', 'blog:blog-detail', _own_post, None),
+    'post-comments': (
+        10, 'GET', 'blog:post-comment-list', _visible_post, None,
+    ),
+    'post-thread': (
+        5, 'GET', 'blog:post-comment-thread', _visible_post, None,
+    ),
+    'comment-replies': (
+        5, 'GET', 'blog:comment-reply-list', _comment, None,
+    ),
+    'tag-list': (5, 'GET', 'blog:tag-list', None, None),
+    'section-list': (5, 'GET', 'blog:section-list', None, None),
+    'comment-list': (5, 'GET', 'blog:comment-list', None, None),
+    'reply-list': (5, 'GET', 'blog:reply-list', None, None),
+    'user-me': (5, 'GET', 'user:me', None, None),
+    'post-like': (5, 'POST', 'blog:blog-like-post', _own_post, {}),
+    'comment-create': (
+        5, 'POST', 'blog:post-comment-list', _visible_post,
+        {'body': 'load test comment'},
+    ),
+    'reply-create': (
+        5, 'POST', 'blog:comment-reply-list', _comment,
+        {'body': 'load test reply'},
+    ),
+}
+
+
+def plan_requests(rng, dataset, count):
+    """Return `count` requests drawn from the weighted scenario.
+
+    Each is (endpoint name, method, path, body, token). Endpoints whose
+    argument the dataset cannot provide are skipped.
+    """
+    names = list(SCENARIO)
+    weights = [SCENARIO[name][0] for name in names]
+    requests = []
+    while len(requests) < count:
+        name = rng.choices(names, weights)[0]
+        _, method, url_name, pick, body = SCENARIO[name]
+        user = rng.choice(dataset['users'])
+        args = []
+        if pick is not None:
+            arg = pick(rng, dataset, user)
+            if arg is None:
+                continue
+            args = [arg]
+        requests.append((
+            name,
+            method,
+            reverse(url_name, args=args),
+            None if body is None else json.dumps(body).encode(),
+            dataset['tokens'][user],
+        ))
+
+    return requests
+
+
+class Client:
+    """One keep-alive HTTP connection replaying planned requests."""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.connection = None
+
+    def send(self, method, path, body, token):
+        """Send one request, returning its status, or None on failure."""
+        headers = {
+            'Accept': 'application/json',
+            'Authorization': f'Token {token}',
+        }
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        for _ in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=30,
+                )
+            try:
+                self.connection.request(
+                    method, self.prefix + path, body, headers,
+                )
+                response = self.connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                # the server may close an idle keep-alive connection
+                self.connection.close()
+                self.connection = None
+
+        return None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+def _run_client(base_url, planned, warmup, deadline, results):
+    client = Client(base_url)
+    try:
+        for index, (name, method, path, body, token) in enumerate(planned):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            start = time.perf_counter()
+            status = client.send(method, path, body, token)
+            end = time.perf_counter()
+            if index >= warmup:
+                results.append((name, start, end, status))
+    finally:
+        client.close()
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of sorted values."""
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(results):
+    """Return the totals and per-endpoint latency percentiles.
+
+    `results` holds (endpoint name, start, end, status) per recorded
+    request. Throughput is over the span of the recorded requests, so
+    warmup requests do not count.
+    """
+    if not results:
+        return {
+            'requests': 0, 'errors': 0, 'elapsed_s': 0.0, 'rps': 0.0,
+            'endpoints': {},
+        }
+
+    elapsed = max(result[2] for result in results) \
+        - min(result[1] for result in results)
+    by_name = {}
+    for name, start, end, status in results:
+        by_name.setdefault(name, []).append((end - start, status))
+
+    endpoints = {}
+    for name in sorted(by_name):
+        samples = by_name[name]
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        endpoints[name] = {
+            'requests': len(samples),
+            'errors': sum(
+                status is None or status >= 400 for _, status in samples
+            ),
+            'rps': round(len(samples) / elapsed, 2),
+            **{
+                f'p{percent}_ms': round(percentile(latencies, percent), 3)
+                for percent in PERCENTILES
+            },
+            'max_ms': round(latencies[-1], 3),
+        }
+
+    return {
+        'requests': len(results),
+        'errors': sum(
+            endpoint['errors'] for endpoint in endpoints.values()
+        ),
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def run(base_url, dataset, clients, requests, warmup=0, duration=None,
+        seed=0):
+    """Drive the API with `clients` concurrent clients.
+
+    Client i replays the same planned requests for the same seed, so
+    runs on different commits do the same work. Each client sends
+    `warmup` unrecorded requests, then up to `requests` recorded ones,
+    stopping early once `duration` seconds have passed.
+    """
+    plans = [
+        plan_requests(random.Random(f'{seed}-{i}'), dataset, warmup + requests)
+        for i in range(clients)
+    ]
+    results = []
+    deadline = None if duration is None else time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=_run_client,
+            args=(base_url, plan, warmup, deadline, results),
+        )
+        for plan in plans
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return summarize(results)
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """The app served by a threaded WSGI server in this process.
+
+    Clients share the interpreter with the server here, so absolute
+    numbers are lower than against uwsgi, but they compare between
+    commits.
+    """
+
+    def __init__(self, host='127.0.0.1'):
+        self.host = host
+        self.server = None
+        self.thread = None
+
+    def __enter__(self):
+        self.server = ThreadedWSGIServer(
+            (self.host, 0), _QuietHandler, allow_reuse_address=False,
+        )
+        self.server.set_app(get_internal_wsgi_application())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True,
+        )
+        self.thread.start()
+        return f'http://{self.host}:{self.server.server_port}'
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        connections.close_all()
+
+
+def git_revision():
+    """Return the commit checked out and whether the tree has changes."""
+    def git(*args):
+        return subprocess.run(
+            ['git', *args],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+    try:
+        return {
+            'commit': git('rev-parse', 'HEAD'),
+            'dirty': bool(
+                git('status', '--porcelain', '--untracked-files=no'),
+            ),
+        }
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
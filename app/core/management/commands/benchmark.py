@@ -0,0 +1,51 @@
+"""
+Django command for running the blog micro-benchmarks
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.benchmarks import CASES
+
+
+class Rollback(Exception):
+    """Raised to discard the rows a benchmark created"""
+
+
+class Command(BaseCommand):
+    """Run a benchmark case inside a transaction that is rolled back"""
+    help = 'Run a blog micro-benchmark and print the timings as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('case', choices=sorted(CASES))
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=200,
+            help='Number of rows the case works on.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of timed runs per variant.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for cmd"""
+        try:
+            with transaction.atomic():
+                results = CASES[options['case']](
+                    options['size'], options['repeat'],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(json.dumps({
+            'case': options['case'],
+            'size': options['size'],
+            'repeat': options['repeat'],
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,140 @@
+"""
+Django command for load testing the API with seeded data
+"""
+import json
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core import loadtest
+from core.seeding import (
+    DATASET_OPTIONS,
+    add_dataset_arguments,
+    seed_blog,
+)
+from blog import cache
+
+
+class Command(BaseCommand):
+    """Seed a dataset, drive a mixed scenario and report per endpoint"""
+    help = (
+        'Load test the API with concurrent clients and print req/s and '
+        'p50/p95/p99 latencies per endpoint as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running app. By default the app is served '
+                 'from this process on a free local port.',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=8,
+            help='Number of concurrent clients.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of recorded requests per client.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Number of unrecorded requests each client sends first.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            help='Stop clients after this many seconds.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the dataset and of the request sequences.',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='loadtest',
+            help='Email prefix of the seeded users.',
+        )
+        parser.add_argument(
+            '--skip-seed',
+            action='store_true',
+            help='Reuse the dataset seeded by a previous run.',
+        )
+        add_dataset_arguments(parser)
+        parser.add_argument(
+            '--output',
+            help='Also write the report to this file.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for cmd"""
+        if options['users'] < 1 or options['clients'] < 1:
+            raise CommandError('--users and --clients must be at least 1.')
+
+        seeded = None
+        if not options['skip_seed']:
+            seeded = seed_blog(
+                options['prefix'],
+                **{name: options[name] for name in DATASET_OPTIONS},
+                seed=options['seed'],
+                search_vectors=False,
+                # the app under test may be serving from this database
+                drop_keys=False,
+            )
+        try:
+            dataset = loadtest.load_dataset(options['prefix'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        # every run starts from a cold response cache
+        cache.get_cache().clear()
+        started_at = timezone.now()
+        if options['url']:
+            server = nullcontext(options['url'])
+            hosts = nullcontext()
+        else:
+            server = loadtest.LocalServer()
+            hosts = override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, server.host],
+            )
+        with hosts, server as base_url:
+            results = loadtest.run(
+                base_url,
+                dataset,
+                clients=options['clients'],
+                requests=options['requests'],
+                warmup=options['warmup'],
+                duration=options['duration'],
+                seed=options['seed'],
+            )
+
+        report = json.dumps({
+            **loadtest.git_revision(),
+            'started_at': started_at.isoformat(),
+            'url': options['url'],
+            'config': {
+                name: options[name] for name in (
+                    'clients', 'requests', 'warmup', 'duration', 'seed',
+                    'prefix',
+                )
+            },
+            'seeded': seeded,
+            **results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report + '\n')
+        self.stdout.write(report)
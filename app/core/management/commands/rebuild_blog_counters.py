@@ -0,0 +1,62 @@
+"""
+Django command for rebuilding the denormalized blog counters
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Count,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+
+from core.models import (
+    Blog,
+    Comment,
+)
+
+
+class Command(BaseCommand):
+    """Recompute like_count and comment_count from the source rows"""
+    help = 'Rebuild Blog.like_count and Blog.comment_count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of posts updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for cmd"""
+        batch_size = options['batch_size']
+        likes = Blog.likes.through.objects.filter(
+            blog_id=OuterRef('pk'),
+        ).order_by().values('blog_id').annotate(n=Count('*')).values('n')
+        comments = Comment.objects.filter(
+            post_id=OuterRef('pk'),
+        ).order_by().values('post_id').annotate(n=Count('*')).values('n')
+
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Blog.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += Blog.objects.filter(
+                    id__gte=ids[0], id__lte=ids[-1],
+                ).update(
+                    like_count=Coalesce(Subquery(likes), 0),
+                    comment_count=Coalesce(Subquery(comments), 0),
+                )
+            last_id = ids[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt counters for {updated} posts.')
+        )
@@ -0,0 +1,16 @@
+"""
+Django command for clearing the request metrics of past workers
+"""
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    """Remove every worker's metrics file before the workers start"""
+    help = 'Reset the request metrics served at /metrics.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for cmd"""
+        metrics.reset()
+        self.stdout.write(self.style.SUCCESS('Request metrics reset.'))
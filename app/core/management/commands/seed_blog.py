@@ -0,0 +1,104 @@
+"""
+Django command for seeding a large synthetic blog dataset
+
+By default the foreign keys of the seeded tables are dropped while the
+rows are copied, which locks those tables for the whole run: seed a
+database nothing else is using, or pass --keep-foreign-keys.
+"""
+import json
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from core.seeding import (
+    DATASET_OPTIONS,
+    add_dataset_arguments,
+    seed_blog,
+)
+from blog import cache
+
+
+class Command(BaseCommand):
+    """Seed users, posts and their links with skewed distributions"""
+    help = (
+        'Replace the seeded dataset with users, posts, tags, sections, '
+        'likes, comments and replies, and report the insert throughput.'
+    )
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the random generator; the same seed and sizes '
+                 'give the same dataset.',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Email prefix of the seeded users.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Number of rows written per COPY statement.',
+        )
+        parser.add_argument(
+            '--skip-search-vectors',
+            action='store_true',
+            help='Leave Blog.search_vector empty on the seeded posts.',
+        )
+        parser.add_argument(
+            '--keep-foreign-keys',
+            action='store_true',
+            help='Copy with the foreign keys in place. Slower, but does not '
+                 'lock the seeded tables, so the app can keep serving. '
+                 'Without it the command refuses to run while other '
+                 'sessions are connected to the database.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for cmd"""
+        if options['users'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--users and --chunk-size must be at least 1.')
+
+        def progress(step, stats):
+            if not options['json']:
+                self.stdout.write(self._line(step, stats))
+
+        try:
+            report = seed_blog(
+                options['prefix'],
+                **{name: options[name] for name in DATASET_OPTIONS},
+                seed=options['seed'],
+                chunk_size=options['chunk_size'],
+                search_vectors=not options['skip_search_vectors'],
+                drop_keys=not options['keep_foreign_keys'],
+                progress=progress,
+            )
+        except ValueError as error:
+            raise CommandError(f'{error} See --keep-foreign-keys.')
+        # the rows were written around the model signals
+        cache.get_cache().clear()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(self.style.SUCCESS(self._line('total', report)))
+
+    @staticmethod
+    def _line(step, stats):
+        rate = stats['rows_per_s']
+        return (
+            f'{step:<16}{stats["rows"]:>12} rows{stats["seconds"]:>10.2f} s'
+            f'{rate if rate is not None else "-":>12} rows/s'
+        )
@@ -0,0 +1,294 @@
+"""
+Request metrics shared by every worker through mmap'd files
+"""
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, math.inf)
+
+# name: (type, help, histogram buckets)
+FAMILIES = {
+    'api_requests_total': (
+        'counter', 'Requests served, by route, method and status.', None,
+    ),
+    'api_request_duration_seconds': (
+        'histogram', 'Time to respond, by route.', LATENCY_BUCKETS,
+    ),
+    'api_request_queries': (
+        'histogram', 'Database queries run per request, by route.',
+        QUERY_BUCKETS,
+    ),
+    'api_cache_hits_total': (
+        'counter', 'Responses served from the API cache, by route.', None,
+    ),
+    'api_cache_misses_total': (
+        'counter', 'Responses computed for the API cache, by route.', None,
+    ),
+    'api_cache_hit_ratio': (
+        'gauge', 'Share of cacheable responses served from cache.', None,
+    ),
+}
+
+_HEADER = struct.Struct('<I4x')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+
+class MmapValues:
+    """Float values by string key in a file written by one process.
+
+    The file starts with the number of bytes used, followed by entries
+    of a key length, the UTF-8 key padded to 8 bytes and a double. An
+    entry is written before the used size covers it, so readers in
+    other processes never see a partial one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map()
+        self._positions = {}
+        used = self._used()
+        if used == 0:
+            used = _HEADER.size
+            _HEADER.pack_into(self._mmap, 0, used)
+        for key, value, position in _entries(self._mmap, used):
+            self._positions[key] = position
+
+    def _map(self):
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+
+    def _used(self):
+        return _HEADER.unpack_from(self._mmap, 0)[0]
+
+    def _append(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-(_LENGTH.size + len(encoded)) % 8)
+        size = _LENGTH.size + padded + _VALUE.size
+        used = self._used()
+        if used + size > len(self._mmap):
+            capacity = len(self._mmap)
+            while used + size > capacity:
+                capacity *= 2
+            self._mmap.close()
+            self._file.truncate(capacity)
+            self._map()
+
+        _LENGTH.pack_into(self._mmap, used, len(encoded))
+        start = used + _LENGTH.size
+        self._mmap[start:start + len(encoded)] = encoded
+        position = start + padded
+        _VALUE.pack_into(self._mmap, position, 0.0)
+        _HEADER.pack_into(self._mmap, 0, used + size)
+        self._positions[key] = position
+
+        return position
+
+    def inc(self, key, amount=1.0):
+        """Add `amount` to the value of `key`."""
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        value = _VALUE.unpack_from(self._mmap, position)[0]
+        _VALUE.pack_into(self._mmap, position, value + amount)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def _entries(buffer, used):
+    """Yield (key, value, value position) of the entries of a file."""
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(buffer[start:start + length]).decode()
+        value_position = start + length + (-(_LENGTH.size + length) % 8)
+        yield key, _VALUE.unpack_from(buffer, value_position)[0], \
+            value_position
+        position = value_position + _VALUE.size
+
+
+def read_values(path):
+    """Return {key: value} of a file, as far as its writer has got."""
+    with open(path, 'rb') as values_file:
+        data = values_file.read()
+    if len(data) < _HEADER.size:
+        return {}
+
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    return {key: value for key, value, _ in _entries(data, used)}
+
+
+_lock = threading.Lock()
+_values = None
+_pid = None
+
+
+def _process_values():
+    # uwsgi forks workers after loading the app, so the file is opened
+    # on first use in each process
+    global _values, _pid
+    pid = os.getpid()
+    if _pid != pid or _values is None \
+            or os.path.dirname(_values.path) != settings.METRICS_DIR:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _values = MmapValues(
+            os.path.join(settings.METRICS_DIR, f'worker-{pid}.db'),
+        )
+        _pid = pid
+
+    return _values
+
+
+def sample_key(family, labels, suffix=''):
+    """Return the key of a sample in the values files."""
+    return json.dumps([family, suffix, sorted(labels.items())])
+
+
+def inc(family, labels, amount=1.0):
+    """Add `amount` to a counter."""
+    with _lock:
+        _process_values().inc(sample_key(family, labels), amount)
+
+
+def observe(family, labels, value):
+    """Record `value` in a histogram."""
+    buckets = FAMILIES[family][2]
+    bound = next(bound for bound in buckets if value <= bound)
+    with _lock:
+        values = _process_values()
+        values.inc(sample_key(family, labels, f'bucket:{bound}'))
+        values.inc(sample_key(family, labels, 'sum'), value)
+        values.inc(sample_key(family, labels, 'count'))
+
+
+def record_request(route, method, status, seconds, queries):
+    """Count a served request with its latency and query count."""
+    labels = {'route': route}
+    inc('api_requests_total', {
+        **labels, 'method': method, 'status': str(status),
+    })
+    observe('api_request_duration_seconds', labels, seconds)
+    observe('api_request_queries', labels, queries)
+
+
+def collect(directory=None):
+    """Return {key: value} summed over the files of every worker."""
+    directory = directory or settings.METRICS_DIR
+    totals = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.db'))):
+        for key, value in read_values(path).items():
+            totals[key] = totals.get(key, 0.0) + value
+
+    return totals
+
+
+def reset(directory=None):
+    """Remove the files of every worker, past and present."""
+    global _values
+    directory = directory or settings.METRICS_DIR
+    with _lock:
+        if _values is not None:
+            _values.close()
+            _values = None
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def cache_ratios(totals):
+    """Return the hit ratio samples of the cache counters in `totals`."""
+    counts = {}
+    for key, value in totals.items():
+        family, _, labels = json.loads(key)
+        if family in ('api_cache_hits_total', 'api_cache_misses_total'):
+            route_counts = counts.setdefault(tuple(map(tuple, labels)), {})
+            route_counts[family] = value
+
+    return {
+        sample_key('api_cache_hit_ratio', dict(labels)):
+            route_counts.get('api_cache_hits_total', 0)
+            / sum(route_counts.values())
+        for labels, route_counts in counts.items()
+        if sum(route_counts.values())
+    }
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n',
+    )
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels
+    ) + '}'
+
+
+def render(totals):
+    """Return the samples in the Prometheus text exposition format."""
+    samples = {}
+    for key, value in totals.items():
+        family, suffix, labels = json.loads(key)
+        series = samples.setdefault(family, {}).setdefault(
+            tuple(map(tuple, labels)), {},
+        )
+        series[suffix] = value
+
+    lines = []
+    for family, (kind, help_text, buckets) in FAMILIES.items():
+        if family not in samples:
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for labels, series in sorted(samples[family].items()):
+            if kind != 'histogram':
+                lines.append(
+                    f'{family}{_labels(labels)} {_number(series[""])}'
+                )
+                continue
+
+            cumulative = 0.0
+            for bound in buckets:
+                cumulative += series.get(f'bucket:{bound}', 0.0)
+                bucket_labels = labels + (('le', _number(bound)),)
+                lines.append(
+                    f'{family}_bucket{_labels(bucket_labels)} '
+                    f'{_number(cumulative)}'
+                )
+            lines.append(
+                f'{family}_sum{_labels(labels)} '
+                f'{_number(series.get("sum", 0.0))}'
+            )
+            lines.append(
+                f'{family}_count{_labels(labels)} '
+                f'{_number(series.get("count", 0.0))}'
+            )
+
+    return '\n'.join(lines) + '\n'
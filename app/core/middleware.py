@@ -0,0 +1,200 @@
+"""
+Middleware measuring requests: metrics for all, timings for a sample,
+and opt-in slow query logs
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core import (
+    metrics,
+    slowlog,
+    timing,
+)
+
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('sql', 'view', 'serialize', 'render')
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Count every request with its latency and queries, by URL name.
+
+    Requests no route matched are counted under `unmatched`, so paths
+    never become labels.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        metrics.record_request(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            elapsed,
+            counter.count,
+        )
+
+        return response
+
+
+class ServerTimingMiddleware:
+    """Time the phases of sampled requests.
+
+    A request is sampled with the rate given for its URL name in
+    SERVER_TIMING_ROUTES, or SERVER_TIMING_SAMPLE_RATE otherwise. Sampled
+    responses carry a Server-Timing header, and each one is logged as a
+    JSON line. The sql and serialize phases run inside the view, so they
+    overlap it. Unsampled requests cost one rate lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.SERVER_TIMING_SAMPLE_RATE
+        self.route_rates = settings.SERVER_TIMING_ROUTES
+
+    def _sampled(self, route):
+        rate = self.route_rates.get(route, self.sample_rate)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            sample = request.__dict__.pop('_server_timing', None)
+            if sample is not None:
+                sample['stack'].close()
+                timing.deactivate(sample['token'])
+        if sample is None:
+            return response
+
+        request_timing = sample['timing']
+        if 'view' not in request_timing.durations:
+            request_timing.add('view', time.perf_counter() - sample['start'])
+        total = time.perf_counter() - start
+        self._report(request, response, request_timing, total)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        route = request.resolver_match.view_name
+        if not self._sampled(route):
+            return None
+
+        request_timing = timing.RequestTiming()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(request_timing))
+        request._server_timing = {
+            'timing': request_timing,
+            'token': timing.activate(request_timing),
+            'stack': stack,
+            'start': time.perf_counter(),
+        }
+        return None
+
+    def process_template_response(self, request, response):
+        sample = getattr(request, '_server_timing', None)
+        if sample is None:
+            return response
+
+        request_timing = sample['timing']
+        render_start = time.perf_counter()
+        request_timing.add('view', render_start - sample['start'])
+
+        def rendered(response):
+            request_timing.add('render', time.perf_counter() - render_start)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _report(self, request, response, request_timing, total):
+        durations = {
+            name: round(request_timing.durations[name] * 1000, 3)
+            for name in PHASES
+        }
+        entries = [
+            f'sql;dur={durations["sql"]};'
+            f'desc="{request_timing.queries} queries"',
+            *(f'{name};dur={durations[name]}' for name in PHASES[1:]),
+            f'total;dur={round(total * 1000, 3)}',
+        ]
+        response['Server-Timing'] = ', '.join(entries)
+
+        record = {
+            'route': request.resolver_match.view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': request_timing.queries,
+            **{f'{name}_ms': value for name, value in durations.items()},
+            'total_ms': round(total * 1000, 3),
+        }
+        logger.info(json.dumps(record), extra={'timing': record})
+
+
+class SlowQueryMiddleware:
+    """Log slow and repeated queries with the route and DRF action.
+
+    Enabled by setting SLOW_QUERY_MS; queries at least that slow are
+    logged, and fingerprints run SLOW_QUERY_REPEAT times or more in one
+    request are logged when it ends. See core.slowlog.
+    """
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold_ms = settings.SLOW_QUERY_MS
+        self.repeat_threshold = settings.SLOW_QUERY_REPEAT
+
+    def __call__(self, request):
+        query_log = slowlog.QueryLog(self.threshold_ms, self.repeat_threshold)
+        request._query_log = query_log
+        token = slowlog.activate(query_log)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(query_log))
+                response = self.get_response(request)
+        finally:
+            slowlog.deactivate(token)
+        query_log.report()
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        query_log = request._query_log
+        query_log.route = request.resolver_match.view_name
+        # viewsets map each HTTP method to an action
+        actions = getattr(view_func, 'actions', None) or {}
+        query_log.action = actions.get(request.method.lower())
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:32
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Populate the new counters from the existing likes and comments."""
+    Blog = apps.get_model('core', 'Blog')
+    Comment = apps.get_model('core', 'Comment')
+    likes = Blog.likes.through.objects.filter(
+        blog_id=OuterRef('pk'),
+    ).order_by().values('blog_id').annotate(n=Count('*')).values('n')
+    comments = Comment.objects.filter(
+        post_id=OuterRef('pk'),
+    ).order_by().values('post_id').annotate(n=Count('*')).values('n')
+    Blog.objects.update(
+        like_count=Coalesce(Subquery(likes), 0),
+        comment_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1.2 on 2026-10-18 16:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Index the posts that existed before the search vector."""
+    Blog = apps.get_model('core', 'Blog')
+    Section = apps.get_model('core', 'Section')
+
+    def section_text(field):
+        return Subquery(
+            Section.objects.filter(blog=OuterRef('pk'))
+            .order_by()
+            .values('blog')
+            .annotate(text=StringAgg(field, ' '))
+            .values('text')
+        )
+
+    Blog.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('detail', weight='B', config='english')
+        + SearchVector(section_text('header'), weight='B', config='english')
+        + SearchVector(
+            section_text('description'), weight='C', config='english',
+        )
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_blog_search__5dfc9b_gin'),
+        ),
+        migrations.RunPython(
+            backfill_search_vector, migrations.RunPython.noop,
+        ),
+    ]
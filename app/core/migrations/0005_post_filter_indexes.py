@@ -0,0 +1,25 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_blog_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['user', 'featured', '-id'], name='core_blog_user_id_b66bd1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['user', 'visible', '-id'], name='core_blog_user_id_e0a1fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['user', 'created_at'], name='core_blog_user_id_1bcba0_idx'),
+        ),
+    ]
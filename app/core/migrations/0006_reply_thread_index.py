@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_post_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['comment', 'created_at'], name='core_reply_comment_974e74_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.1.2 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_reply_thread_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='blog',
+            name='core_blog_user_id_b66bd1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='blog',
+            name='core_blog_user_id_e0a1fb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['user', '-id'], name='core_blog_user_id_67c19b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('featured', True)), fields=['user', '-id'], name='core_blog_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(condition=models.Q(('visible', True)), fields=['user', '-id'], name='core_blog_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='core_commen_user_id_de8018_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at', '-id'], name='core_commen_post_id_0f9978_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='core_reply_user_id_d270ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['user', 'header'], name='core_sectio_user_id_95e06e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='core_tag_user_id_74e398_idx'),
+        ),
+    ]
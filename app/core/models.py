@@ -5,7 +5,13 @@ import uuid
 import os
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import (
+    connection,
+    models,
+)
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -70,6 +76,13 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'name']),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,11 +97,64 @@ class Section(models.Model):
     header = models.CharField(max_length=255, null=True)
     image = models.ImageField(null=True, upload_to=section_image_file_path, blank=True)
     description = models.CharField(max_length=5000, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'header']),
+        ]
 
     def __str__(self):
         return self.header
 
 
+class BlogManager(models.Manager):
+    """Manager for blog posts"""
+
+    def toggle_like(self, post_id, user_id, owner_id):
+        """Like or unlike a post in one statement.
+
+        Deletes the like if present, otherwise inserts it, and applies the
+        change to like_count. Returns (liked, like_count), or None when
+        `owner_id` has no post `post_id`. Concurrent toggles never leave
+        the counter out of step with the like rows.
+        """
+        likes = self.model.likes.through._meta
+        sql = f"""
+            WITH post AS (
+                SELECT id FROM {self.model._meta.db_table}
+                WHERE id = %(post)s AND user_id = %(owner)s
+            ), removed AS (
+                DELETE FROM {likes.db_table}
+                WHERE blog_id IN (SELECT id FROM post)
+                AND user_id = %(user)s
+                RETURNING 1
+            ), added AS (
+                INSERT INTO {likes.db_table} (blog_id, user_id)
+                SELECT id, %(user)s FROM post
+                WHERE NOT EXISTS (SELECT 1 FROM removed)
+                ON CONFLICT (blog_id, user_id) DO NOTHING
+                RETURNING 1
+            )
+            UPDATE {self.model._meta.db_table}
+            SET like_count = like_count
+                + (SELECT count(*) FROM added)
+                - (SELECT count(*) FROM removed),
+                updated_at = %(now)s
+            WHERE id IN (SELECT id FROM post)
+            RETURNING NOT EXISTS (SELECT 1 FROM removed), like_count
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'post': post_id,
+                'user': user_id,
+                'owner': owner_id,
+                'now': timezone.now(),
+            })
+            return cursor.fetchone()
+
+
 class Blog(models.Model):
     """Blog post model."""
     user = models.ForeignKey(
@@ -99,11 +165,38 @@ class Blog(models.Model):
     detail = models.CharField(max_length=2000, null=True)
     featured = models.BooleanField(default=False)
     visit_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
     visible = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     sections = models.ManyToManyField(Section, blank=True)
     tags = models.ManyToManyField(Tag, blank=True)
     likes = models.ManyToManyField(User, blank=True, related_name='likes')
+    # title, detail and section text, maintained by blog.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = BlogManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', '-id']),
+            # featured=1 and visible=1 lists; the other values are most
+            # posts, which a filtered walk of (user, -id) serves
+            models.Index(
+                fields=['user', '-id'],
+                condition=models.Q(featured=True),
+                name='core_blog_featured_idx',
+            ),
+            models.Index(
+                fields=['user', '-id'],
+                condition=models.Q(visible=True),
+                name='core_blog_visible_idx',
+            ),
+            models.Index(fields=['user', 'created_at']),
+            GinIndex(fields=['search_vector']),
+        ]
 
     def __str__(self):
         return self.title
@@ -122,6 +215,14 @@ class Comment(models.Model):
     )
     body = models.CharField(max_length=2500)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['post', '-created_at', '-id']),
+        ]
 
 
 class Reply(models.Model):
@@ -137,3 +238,12 @@ class Reply(models.Model):
     )
     body = models.CharField(max_length=2500)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', '-created_at', '-id']),
+            # the replies of a comment in order, for threads
+            models.Index(fields=['comment', 'created_at']),
+        ]
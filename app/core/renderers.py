@@ -0,0 +1,67 @@
+"""
+JSON renderers backed by orjson, falling back to the stdlib encoder
+"""
+from rest_framework.renderers import (
+    BaseRenderer,
+    JSONRenderer,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render JSON with orjson when it is installed.
+
+    Types orjson does not encode natively, and datetimes so their format
+    stays DRF's, are handed to the DRF encoder, so the bytes match
+    JSONRenderer. Pretty printed, ASCII-only or non-compact output is
+    left to JSONRenderer. Unlike JSONRenderer, NaN and infinity encode
+    as null rather than raising.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # keep the output a strict javascript subset, like JSONRenderer
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028',
+        ).replace(
+            '\u2029'.encode(), b'\\u2029',
+        )
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render a list as newline delimited JSON, one object per line"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render_lines(self, items):
+        """Yield the encoded line of every item, for streaming."""
+        renderer = FastJSONRenderer()
+        for item in items:
+            yield renderer.render(item) + b'\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, (list, tuple)):
+            # e.g. an error response
+            data = [data]
+
+        return b''.join(self.render_lines(data))
@@ -0,0 +1,572 @@
+"""
+Deterministic, skewed blog datasets for load tests and local development
+"""
+import datetime
+import io
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import (
+    connection,
+    transaction,
+)
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (
+    Blog,
+    Comment,
+    Reply,
+    Section,
+    Tag,
+)
+from blog.search import update_search_vectors
+
+
+# option name: (default, help) of the dataset sizes, shared by commands
+DATASET_OPTIONS = {
+    'users': (100, 'Number of users.'),
+    'posts': (10000, 'Number of posts.'),
+    'tags_per_user': (20, 'Number of tags each user owns.'),
+    'sections_per_user': (40, 'Number of sections each user owns.'),
+    'tags_per_post': (3, 'Number of tags linked to each post.'),
+    'sections_per_post': (2, 'Number of sections linked to each post.'),
+    'likes_per_post': (5.0, 'Mean number of likes of a post.'),
+    'comments_per_post': (2.0, 'Mean number of comments on a post.'),
+    'replies_per_comment': (1.0, 'Mean number of replies to a comment.'),
+    'skew': (1.1, 'Zipf exponent of user activity and tag popularity.'),
+}
+
+# Pareto shape of the per post and per comment counts: most get a few,
+# a handful get hundreds
+TAIL_ALPHA = 1.5
+# steps that write no rows of their own
+UNCOUNTED_STEPS = ('delete', 'foreign_keys', 'analyze', 'search_vectors')
+# models written with COPY
+COPIED_MODELS = (
+    Tag, Section, Blog, Blog.tags.through, Blog.sections.through,
+    Blog.likes.through, Comment, Reply,
+)
+# rows are dated over this many days before the seeding time
+SPAN_DAYS = 365
+
+
+def add_dataset_arguments(parser):
+    """Add an option per entry of DATASET_OPTIONS to `parser`."""
+    for name, (default, help_text) in DATASET_OPTIONS.items():
+        parser.add_argument(
+            f'--{name.replace("_", "-")}',
+            type=type(default),
+            default=default,
+            help=help_text,
+        )
+
+
+def seed_emails(prefix):
+    """Return the filter matching the emails of seeded users."""
+    return {
+        'email__startswith': f'{prefix}-',
+        'email__endswith': '@example.com',
+    }
+
+
+def delete_dataset(prefix):
+    """Delete the seeded users and every row that depends on them.
+
+    Rows are deleted set-wise, children first, since the ORM cascade
+    loads every row of a large dataset into memory. Returns the number
+    of rows deleted.
+    """
+    users = list(
+        get_user_model().objects.filter(
+            **seed_emails(prefix)
+        ).values_list('id', flat=True)
+    )
+    if not users:
+        return 0
+
+    # a subquery is hashed once, where an array is searched for each row
+    seeded = 'IN (SELECT unnest(%s))'
+    posts = f'SELECT id FROM {Blog._meta.db_table} WHERE user_id {seeded}'
+    comments = (
+        f'SELECT id FROM {Comment._meta.db_table} '
+        f'WHERE user_id {seeded} OR post_id IN ({posts})'
+    )
+    statements = [
+        (
+            f'DELETE FROM {Reply._meta.db_table} '
+            f'WHERE user_id {seeded} OR comment_id IN ({comments})',
+            3,
+        ),
+        (
+            f'DELETE FROM {Comment._meta.db_table} '
+            f'WHERE user_id {seeded} OR post_id IN ({posts})',
+            2,
+        ),
+        (
+            f'DELETE FROM {Blog.likes.through._meta.db_table} '
+            f'WHERE user_id {seeded} OR blog_id IN ({posts})',
+            2,
+        ),
+        *(
+            (
+                f'DELETE FROM {through._meta.db_table} '
+                f'WHERE blog_id IN ({posts})',
+                1,
+            )
+            for through in (Blog.tags.through, Blog.sections.through)
+        ),
+        *(
+            (
+                f'DELETE FROM {model._meta.db_table} WHERE user_id {seeded}',
+                1,
+            )
+            for model in (Blog, Tag, Section, Token)
+        ),
+    ]
+    deleted = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql, uses in statements:
+            cursor.execute(sql, [users] * uses)
+            deleted += cursor.rowcount
+        deleted += get_user_model().objects.filter(id__in=users).delete()[0]
+
+    return deleted
+
+
+def zipf_cum_weights(size, skew):
+    """Return cumulative Zipf weights of `size` ranks, for rng.choices."""
+    weights = []
+    total = 0.0
+    for rank in range(1, size + 1):
+        total += rank ** -skew
+        weights.append(total)
+
+    return weights
+
+
+def tail_count(rng, mean, cap):
+    """Draw a count from a Pareto tail with the given mean, up to `cap`."""
+    if mean <= 0 or cap <= 0:
+        return 0
+    value = mean * (TAIL_ALPHA - 1) / TAIL_ALPHA * rng.paretovariate(
+        TAIL_ALPHA,
+    )
+    # rounding at random keeps the mean
+    return min(int(value + rng.random()), cap)
+
+
+def skewed_sample(rng, population, cum_weights, count):
+    """Return `count` distinct items, the heavier ones more often."""
+    if count * 2 > len(population):
+        return rng.sample(population, count)
+
+    picked = set()
+    while len(picked) < count:
+        picked.update(rng.choices(
+            population, cum_weights=cum_weights, k=count - len(picked),
+        ))
+
+    return list(picked)
+
+
+def reserve_ids(model, count):
+    """Take `count` ids from the primary key sequence of `model`."""
+    if not count:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _copy_text(value):
+    return (
+        value.replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+# COPY text format of values by type, str() for the other types
+_COPY_FORMATS = {
+    type(None): lambda value: '\\N',
+    bool: lambda value: 't' if value else 'f',
+    str: _copy_text,
+    datetime.datetime: datetime.datetime.isoformat,
+}
+
+
+def _copy_value(value):
+    return _COPY_FORMATS.get(type(value), str)(value)
+
+
+def copy_rows(table, columns, rows, chunk_size):
+    """COPY `rows` into `table`, `chunk_size` rows per statement."""
+    sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+    copied = 0
+    with connection.cursor() as cursor:
+        def flush(buffer):
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+
+        buffer = io.StringIO()
+        pending = 0
+        for row in rows:
+            buffer.write('\t'.join(map(_copy_value, row)))
+            buffer.write('\n')
+            pending += 1
+            if pending == chunk_size:
+                flush(buffer)
+                copied += pending
+                buffer = io.StringIO()
+                pending = 0
+        if pending:
+            flush(buffer)
+            copied += pending
+
+    return copied
+
+
+def other_connections():
+    """Return the number of other client sessions on the database."""
+    with connection.cursor() as cursor:
+        # the activity is read once per transaction unless cleared
+        cursor.execute('SELECT pg_stat_clear_snapshot()')
+        cursor.execute(
+            'SELECT count(*) FROM pg_stat_activity '
+            'WHERE datname = current_database() '
+            'AND pid <> pg_backend_pid() '
+            "AND backend_type = 'client backend'"
+        )
+        return cursor.fetchone()[0]
+
+
+def drop_foreign_keys(models):
+    """Drop the foreign keys of `models`, returning them for add_foreign_keys.
+
+    Adding a key back validates every row with one join, where a key in
+    place checks each copied row on its own. Run both in one transaction,
+    so the keys come back if anything in between fails. Dropping a key
+    locks both of its tables ACCESS EXCLUSIVE until that transaction
+    ends, so only do it on a database nothing else is using.
+    """
+    qn = connection.ops.quote_name
+    keys = []
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            constraints = connection.introspection.get_constraints(
+                cursor, table,
+            )
+            for name, constraint in sorted(constraints.items()):
+                if constraint['foreign_key']:
+                    keys.append((
+                        table, name, constraint['columns'],
+                        constraint['foreign_key'],
+                    ))
+        for table, name, _, _ in keys:
+            cursor.execute(
+                f'ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(name)}'
+            )
+
+    return keys
+
+
+def add_foreign_keys(keys):
+    """Add back, and so validate, the keys dropped by drop_foreign_keys."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for table, name, columns, (to_table, to_column) in keys:
+            cursor.execute(
+                f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} '
+                f'FOREIGN KEY ({", ".join(map(qn, columns))}) '
+                f'REFERENCES {qn(to_table)} ({qn(to_column)}) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+
+
+class _Steps:
+    """Time each seeding step and hand it to the progress callback."""
+
+    def __init__(self, progress):
+        self.progress = progress
+        self.tables = {}
+
+    def run(self, name, func):
+        start = time.perf_counter()
+        rows = func()
+        seconds = time.perf_counter() - start
+        self.tables[name] = {
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'rows_per_s': round(rows / seconds) if rows and seconds else None,
+        }
+        if self.progress is not None:
+            self.progress(name, self.tables[name])
+
+        return rows
+
+
+def seed_blog(prefix, users, posts, tags_per_user, sections_per_user,
+              tags_per_post, sections_per_post, likes_per_post,
+              comments_per_post, replies_per_comment, skew=1.1, seed=0,
+              chunk_size=10000, search_vectors=True, drop_keys=True,
+              progress=None):
+    """Replace the dataset of `prefix` with a new one.
+
+    Users get posts, likes, comments and replies by Zipf weights, so a
+    few users write most of them, and tags and sections are linked by
+    popularity. Likes and comments per post and replies per comment
+    follow a Pareto tail with the given means. The same arguments give
+    the same rows, dated relative to the time of seeding.
+
+    Rows are written with COPY in chunks of `chunk_size`, with ids
+    reserved from the sequences up front, and counters are written with
+    the posts. Seeded users have an unusable password and a token.
+    `progress(step, stats)` is called as each step finishes. Returns the
+    rows, seconds and rows/s of each step and in total.
+
+    With `drop_keys`, the foreign keys of the copied tables are dropped
+    for the whole seed, locking those tables, and ValueError is raised
+    when other sessions are connected to the database. Otherwise the
+    keys stay in place and check each row as it is copied, parents
+    being copied before their children, which is slower but safe next
+    to a serving app.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    span = datetime.timedelta(days=SPAN_DAYS)
+    steps = _Steps(progress)
+    start = time.perf_counter()
+
+    if drop_keys:
+        sessions = other_connections()
+        if sessions:
+            raise ValueError(
+                f'{sessions} other session(s) connected to the database; '
+                f'dropping foreign keys would lock them out of the seeded '
+                f'tables. Stop them or keep the foreign keys.'
+            )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # deferred checks would block dropping the foreign keys, and
+            # queue an event per copied row while they are kept
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            if drop_keys:
+                # fail, rather than queue every session behind the locks,
+                # when a session connected since the check
+                cursor.execute("SET LOCAL lock_timeout = '5s'")
+        keys = drop_foreign_keys(COPIED_MODELS) if drop_keys else []
+        steps.run('delete', lambda: delete_dataset(prefix))
+
+        def create_users():
+            password = make_password(None)
+            user_objs = get_user_model().objects.bulk_create(
+                (
+                    get_user_model()(
+                        email=f'{prefix}-{i}@example.com',
+                        name=f'{prefix} {i}',
+                        password=password,
+                    )
+                    for i in range(users)
+                ),
+                batch_size=chunk_size,
+            )
+            Token.objects.bulk_create(
+                (
+                    Token(key=Token.generate_key(), user=user)
+                    for user in user_objs
+                ),
+                batch_size=chunk_size,
+            )
+            user_ids.extend(user.pk for user in user_objs)
+            return len(user_objs)
+
+        user_ids = []
+        steps.run('users', create_users)
+        if not user_ids:
+            add_foreign_keys(keys)
+            return {
+                'tables': steps.tables, 'rows': 0, 'seconds': 0.0,
+                'rows_per_s': None,
+            }
+        # a shuffled order, so the most active users are not the first
+        active = rng.sample(user_ids, len(user_ids))
+        user_weights = zipf_cum_weights(len(active), skew)
+
+        def attributes(model, field, label, per_user):
+            ids = reserve_ids(model, len(user_ids) * per_user)
+            owned.setdefault(model, {})
+            rows = []
+            for n, user in enumerate(user_ids):
+                own = ids[n * per_user:(n + 1) * per_user]
+                owned[model][user] = own
+                rows.extend(
+                    (pk, user, f'{label} {i}', now)
+                    for i, pk in enumerate(own)
+                )
+            return copy_rows(
+                model._meta.db_table,
+                ['id', 'user_id', field, 'updated_at'],
+                rows,
+                chunk_size,
+            )
+
+        owned = {}
+        steps.run(
+            'tags', lambda: attributes(Tag, 'name', 'tag', tags_per_user),
+        )
+        steps.run('sections', lambda: attributes(
+            Section, 'header', 'header', sections_per_user,
+        ))
+
+        post_ids = reserve_ids(Blog, posts)
+        post_users = rng.choices(active, cum_weights=user_weights, k=posts)
+        # posts are dated in id order
+        post_times = sorted(
+            now - span * rng.random() for _ in range(posts)
+        )
+        like_counts = [
+            tail_count(rng, likes_per_post, len(user_ids))
+            for _ in range(posts)
+        ]
+        comment_counts = [
+            tail_count(rng, comments_per_post, 10 * posts)
+            for _ in range(posts)
+        ]
+
+        def post_rows():
+            stamps = [posted.isoformat() for posted in post_times]
+            for n, pk in enumerate(post_ids):
+                yield (
+                    pk, post_users[n], f'post {n}', 'detail ' * 20,
+                    rng.random() < 0.1, 0, like_counts[n],
+                    comment_counts[n], rng.random() < 0.9,
+                    stamps[n], stamps[n],
+                )
+
+        steps.run('posts', lambda: copy_rows(
+            Blog._meta.db_table,
+            ['id', 'user_id', 'title', 'detail', 'featured', 'visit_count',
+             'like_count', 'comment_count', 'visible', 'created_at',
+             'updated_at'],
+            post_rows(),
+            chunk_size,
+        ))
+
+        def links(model, field, per_post):
+            through = getattr(Blog, field).through
+            target = through._meta.get_field(model._meta.model_name).column
+            weights = {}
+
+            def rows():
+                for n, pk in enumerate(post_ids):
+                    own = owned[model][post_users[n]]
+                    if len(own) not in weights:
+                        weights[len(own)] = zipf_cum_weights(len(own), skew)
+                    for target_id in skewed_sample(
+                        rng, own, weights[len(own)], min(per_post, len(own)),
+                    ):
+                        yield pk, target_id
+
+            return copy_rows(
+                through._meta.db_table, ['blog_id', target], rows(),
+                chunk_size,
+            )
+
+        steps.run('post_tags', lambda: links(Tag, 'tags', tags_per_post))
+        steps.run('post_sections', lambda: links(
+            Section, 'sections', sections_per_post,
+        ))
+
+        def like_rows():
+            for n, pk in enumerate(post_ids):
+                for user in skewed_sample(
+                    rng, active, user_weights, like_counts[n],
+                ):
+                    yield pk, user
+
+        steps.run('likes', lambda: copy_rows(
+            Blog.likes.through._meta.db_table, ['blog_id', 'user_id'],
+            like_rows(), chunk_size,
+        ))
+
+        comment_ids = reserve_ids(Comment, sum(comment_counts))
+        comment_times = []
+
+        def comment_rows():
+            ids = iter(comment_ids)
+            for n, pk in enumerate(post_ids):
+                posted = post_times[n]
+                for user in rng.choices(
+                    active, cum_weights=user_weights, k=comment_counts[n],
+                ):
+                    created = posted + (now - posted) * rng.random()
+                    comment_times.append(created)
+                    stamp = created.isoformat()
+                    yield next(ids), user, pk, 'comment', stamp, stamp
+
+        steps.run('comments', lambda: copy_rows(
+            Comment._meta.db_table,
+            ['id', 'user_id', 'post_id', 'body', 'created_at', 'updated_at'],
+            comment_rows(),
+            chunk_size,
+        ))
+
+        def reply_rows():
+            for pk, commented in zip(comment_ids, comment_times):
+                for user in rng.choices(
+                    active, cum_weights=user_weights, k=tail_count(
+                        rng, replies_per_comment, 10 * len(comment_ids),
+                    ),
+                ):
+                    stamp = (
+                        commented + (now - commented) * rng.random()
+                    ).isoformat()
+                    yield user, pk, 'reply', stamp, stamp
+
+        steps.run('replies', lambda: copy_rows(
+            Reply._meta.db_table,
+            ['user_id', 'comment_id', 'body', 'created_at', 'updated_at'],
+            reply_rows(),
+            chunk_size,
+        ))
+
+        if drop_keys:
+            steps.run('foreign_keys', lambda: add_foreign_keys(keys) or 0)
+
+        def analyze():
+            # the planner has no statistics for the copied rows yet
+            with connection.cursor() as cursor:
+                for model in (get_user_model(), *COPIED_MODELS):
+                    cursor.execute(f'ANALYZE {model._meta.db_table}')
+            return 0
+
+        steps.run('analyze', analyze)
+
+        if search_vectors:
+            def index_posts():
+                for i in range(0, len(post_ids), chunk_size):
+                    update_search_vectors(post_ids[i:i + chunk_size])
+                return len(post_ids)
+
+            steps.run('search_vectors', index_posts)
+
+    seconds = time.perf_counter() - start
+    rows = sum(
+        stats['rows'] for name, stats in steps.tables.items()
+        if name not in UNCOUNTED_STEPS
+    )
+    return {
+        'tables': steps.tables,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_s': round(rows / seconds) if rows and seconds else None,
+    }
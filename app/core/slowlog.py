@@ -0,0 +1,178 @@
+"""
+Slow and repeated query logging, attributed to views and project code
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import traceback
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 8
+
+# the request instrumentation, which wraps every query
+_SKIPPED_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('slowlog.py', 'middleware.py', 'timing.py')
+}
+
+_current = contextvars.ContextVar('query_log', default=None)
+# (serializer class name, field name) of the field being rendered
+_field = contextvars.ContextVar('serializer_field', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Return the SQL with values and value lists folded, and its hash.
+
+    Queries that differ only in their parameters, IN list lengths or
+    number of inserted rows share a fingerprint.
+    """
+    normalized = _STRING.sub('%s', sql)
+    normalized = _NUMBER.sub('%s', normalized)
+    normalized = _PLACEHOLDERS.sub('(...)', normalized)
+    normalized = _ROWS.sub('(...)', normalized)
+    normalized = _SPACE.sub(' ', normalized).strip()
+
+    return normalized, hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def project_stack(limit=STACK_DEPTH):
+    """Return the innermost project frames of the current stack.
+
+    Frames are 'path:line function' with paths relative to BASE_DIR.
+    Library frames and the request instrumentation are left out.
+    """
+    base = os.path.join(str(settings.BASE_DIR), '')
+    frames = []
+    for frame in traceback.extract_stack():
+        if not frame.filename.startswith(base) \
+                or 'site-packages' in frame.filename \
+                or frame.filename in _SKIPPED_FILES:
+            continue
+        path = os.path.relpath(frame.filename, base)
+        frames.append(f'{path}:{frame.lineno} {frame.name}')
+
+    return frames[-limit:]
+
+
+def current():
+    """Return the query log of the request in progress, if any."""
+    return _current.get()
+
+
+def activate(query_log):
+    """Make `query_log` current, returning a token for deactivate()."""
+    return _current.set(query_log)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def attribute_fields(serializer, fields):
+    """Yield `fields`, marking each as the one `serializer` renders.
+
+    Queries run while a field is current, such as the related lookups
+    of its get_attribute() or of a nested serializer, are logged with
+    the serializer class and field name. Fields are only marked while a
+    query log is current.
+    """
+    if _current.get() is None:
+        yield from fields
+        return
+
+    name = type(serializer).__name__
+    previous = _field.get()
+    try:
+        for field in fields:
+            _field.set((name, field.field_name))
+            yield field
+    finally:
+        _field.set(previous)
+
+
+class QueryLog:
+    """Database execute wrapper logging the queries of one request.
+
+    Queries taking `threshold_ms` or more are logged as they finish. Every
+    query is counted by fingerprint, and report() logs the fingerprints
+    run at least `repeat_threshold` times, which is how N+1 patterns
+    show up. Stacks and serializer fields are captured for slow queries
+    and for the second run of each fingerprint only.
+    """
+
+    def __init__(self, threshold_ms, repeat_threshold):
+        self.threshold = threshold_ms / 1000
+        self.repeat_threshold = repeat_threshold
+        self.route = None
+        self.action = None
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._record(sql, time.perf_counter() - start)
+
+    def _record(self, sql, seconds):
+        normalized, digest = fingerprint(sql)
+        entry = self.queries.setdefault(digest, {
+            'sql': normalized, 'count': 0, 'seconds': 0.0, 'stack': None,
+            'field': None,
+        })
+        entry['count'] += 1
+        entry['seconds'] += seconds
+
+        slow = seconds >= self.threshold
+        stack = project_stack() if slow else None
+        if entry['count'] == 2:
+            entry['stack'] = project_stack() if stack is None else stack
+            entry['field'] = _field.get()
+        if slow:
+            self._log('slow_query', digest, entry, {
+                'ms': round(seconds * 1000, 3),
+                'repeats': entry['count'],
+                **_field_names(_field.get()),
+                'stack': stack,
+            })
+
+    def report(self):
+        """Log the fingerprints repeated past the threshold."""
+        for digest, entry in self.queries.items():
+            if entry['count'] >= self.repeat_threshold:
+                self._log('repeated_query', digest, entry, {
+                    'count': entry['count'],
+                    'total_ms': round(entry['seconds'] * 1000, 3),
+                    **_field_names(entry['field']),
+                    'stack': entry['stack'],
+                })
+
+    def _log(self, event, digest, entry, fields):
+        record = {
+            'event': event,
+            'route': self.route,
+            'action': self.action,
+            'fingerprint': digest,
+            'sql': entry['sql'],
+            **fields,
+        }
+        logger.warning(json.dumps(record), extra={'query': record})
+
+
+def _field_names(field):
+    serializer, name = field or (None, None)
+    return {'serializer': serializer, 'field': name}
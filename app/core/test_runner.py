@@ -0,0 +1,24 @@
+"""
+Test runner for the project
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Django's runner, with post visits left uncounted.
+
+    The API writes visits behind each request, so visits recorded in
+    one test would be written during a later one, or after the run into
+    the development database. Tests of visit counting enable it with
+    override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._count_visits = settings.BLOG_COUNT_VISITS
+        settings.BLOG_COUNT_VISITS = False
+
+    def teardown_test_environment(self, **kwargs):
+        settings.BLOG_COUNT_VISITS = self._count_visits
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,186 @@
+"""
+Tests holding every API route to its query and latency budget
+"""
+import os
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import budgets
+from core.models import (
+    Blog,
+    Comment,
+    Reply,
+    Section,
+    Tag,
+)
+from blog import cache
+
+
+BUDGET = budgets.load_budget()
+
+
+def seed(user, posts, tags, sections, comments_per_post,
+         replies_per_comment):
+    """Create the user's posts, their relations, comments and replies."""
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'tag {i}') for i in range(tags)
+    )
+    sections = Section.objects.bulk_create(
+        Section(user=user, header=f'header {i}') for i in range(sections)
+    )
+    posts = Blog.objects.bulk_create(
+        Blog(user=user, title=f'post {i}', detail='detail ' * 20)
+        for i in range(posts)
+    )
+    Blog.tags.through.objects.bulk_create(
+        Blog.tags.through(blog=post, tag=tags[(i + n) % len(tags)])
+        for i, post in enumerate(posts) for n in range(3)
+    )
+    Blog.sections.through.objects.bulk_create(
+        Blog.sections.through(
+            blog=post, section=sections[(i + n) % len(sections)],
+        )
+        for i, post in enumerate(posts) for n in range(2)
+    )
+    comments = Comment.objects.bulk_create(
+        Comment(user=user, post=post, body='comment')
+        for post in posts for i in range(comments_per_post)
+    )
+    Reply.objects.bulk_create(
+        Reply(user=user, comment=comment, body='reply')
+        for comment in comments for i in range(replies_per_comment)
+    )
+
+    return posts[-1], comments[-1]
+
+
+class BudgetTests(TestCase):
+    """Test each route in budgets.json stays within its budget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.password = 'testpass123'
+        cls.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password=cls.password,
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.post, cls.comment = seed(cls.user, **BUDGET['seed'])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.context = {
+            'email': self.user.email,
+            'password': self.password,
+            'post': self.post.pk,
+            'comment': self.comment.pk,
+        }
+
+    def _request(self, route):
+        url = reverse(
+            route['url'],
+            args=[self.context[arg] for arg in route.get('args', [])],
+        )
+        if route['method'] == 'GET':
+            return self.client.get(url, route.get('params'))
+
+        data = {
+            key: value.format(**self.context)
+            for key, value in route.get('data', {}).items()
+        }
+        return self.client.post(url, data, format='json')
+
+    def _measure(self, route):
+        """Return the worst query count and median latency of a route."""
+        # the first request pays for imports and connection setup
+        self._request(route)
+        queries = []
+        timings = []
+        for _ in range(BUDGET['repeat']):
+            # budgets hold for the uncached path
+            cache.get_cache().clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                res = self._request(route)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.assertLess(res.status_code, 400, res.content)
+            queries.append(len(captured))
+
+        return {'queries': max(queries), 'ms': statistics.median(timings)}
+
+    def test_routes_within_budget(self):
+        """Test no route exceeds its query count or latency ceiling"""
+        measured = {
+            name: self._measure(route)
+            for name, route in BUDGET['routes'].items()
+        }
+        rows = budgets.compare(
+            BUDGET['routes'],
+            measured,
+            latency_scale=float(os.environ.get('BUDGET_LATENCY_SCALE', 1)),
+        )
+
+        over = [row['route'] for row in rows if row['over']]
+        self.assertFalse(
+            over, f'Routes over budget:\n{budgets.format_table(rows)}',
+        )
+
+
+class CompareTests(SimpleTestCase):
+    """Test budget comparison and the diff table."""
+
+    routes = {
+        'fast': {'max_queries': 2, 'max_ms': 10},
+        'slow': {'max_queries': 2, 'max_ms': 10},
+    }
+
+    def test_compare_flags_excess(self):
+        """Test a route over either limit is marked, scaled latency aside"""
+        rows = budgets.compare(self.routes, {
+            'fast': {'queries': 2, 'ms': 15.0},
+            'slow': {'queries': 3, 'ms': 1.0},
+        }, latency_scale=2)
+
+        self.assertEqual([row['over'] for row in rows], [False, True])
+        self.assertEqual(rows[0]['max_ms'], 20)
+
+    def test_format_table(self):
+        """Test the table lists each limit with its signed difference"""
+        rows = budgets.compare(self.routes, {
+            'fast': {'queries': 1, 'ms': 4.0},
+            'slow': {'queries': 3, 'ms': 12.5},
+        })
+
+        lines = budgets.format_table(rows).splitlines()
+
+        self.assertEqual(lines[0].split(), [
+            'route', 'queries', 'budget', 'diff', 'ms', 'budget', 'diff',
+        ])
+        self.assertEqual(lines[1].split(), [
+            'fast', '1', '2', '-1', '4.0', '10.0', '-6.0', 'ok',
+        ])
+        self.assertEqual(lines[2].split(), [
+            'slow', '3', '2', '+1', '12.5', '10.0', '+2.5', 'OVER',
+        ])
+
+    def test_budget_routes_resolve(self):
+        """Test every route in the budget file names a URL and limits"""
+        for name, route in BUDGET['routes'].items():
+            with self.subTest(route=name):
+                self.assertIn(route['method'], ('GET', 'POST'))
+                self.assertIsInstance(route['max_queries'], int)
+                self.assertGreater(route['max_ms'], 0)
+                reverse(route['url'], args=[1] * len(route.get('args', [])))
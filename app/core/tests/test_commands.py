@@ -2,13 +2,22 @@
 """
 Test custom Django manage commands
 """
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import metrics
+from core.models import Blog, Comment
+from blog.benchmarks import CASES
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -42,3 +51,70 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class RebuildCountersCommandTests(TestCase):
+    """Test the rebuild_blog_counters command."""
+
+    def test_rebuild_blog_counters(self):
+        """Test drifted counters are recomputed from the source rows"""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123',
+        )
+        post = Blog.objects.create(user=user, title='post')
+        empty = Blog.objects.create(user=user, title='empty', like_count=7)
+        post.likes.add(user)
+        Comment.objects.create(user=user, post=post, body='body')
+        Comment.objects.create(user=user, post=post, body='body')
+
+        call_command('rebuild_blog_counters', batch_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        empty.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(empty.like_count, 0)
+        self.assertEqual(empty.comment_count, 0)
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test the benchmark command."""
+
+    def test_benchmark_rolls_back(self):
+        """Test a benchmark reports every variant and leaves no rows"""
+        out = StringIO()
+
+        call_command('benchmark', 'm2m_sync', size=5, repeat=2, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            set(report['results']), {'clear_and_add', 'diff'},
+        )
+        self.assertEqual(
+            report['results']['diff']['links_written_per_run'], 2,
+        )
+        self.assertFalse(Blog.objects.exists())
+
+    def test_every_case_runs(self):
+        """Test every registered benchmark runs at a small size"""
+        for case in CASES:
+            out = StringIO()
+            call_command('benchmark', case, size=3, repeat=1, stdout=out)
+
+            self.assertTrue(json.loads(out.getvalue())['results'])
+
+
+class ResetMetricsCommandTests(SimpleTestCase):
+    """Test clearing the request metrics."""
+
+    def test_reset_metrics(self):
+        """Test every worker file is removed"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            metrics.inc('api_requests_total', {'route': 'r'})
+            open(os.path.join(directory, 'worker-1.db'), 'wb').close()
+
+            call_command('reset_metrics', stdout=StringIO())
+
+            self.assertEqual(os.listdir(directory), [])
+            self.assertEqual(metrics.collect(), {})
@@ -0,0 +1,75 @@
+"""
+Tests for the load test harness
+"""
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+)
+
+from core import loadtest
+
+
+SIZES = {
+    'users': 3,
+    'posts': 30,
+    'tags_per_user': 4,
+    'sections_per_user': 4,
+    'tags_per_post': 2,
+    'sections_per_post': 1,
+    'likes_per_post': 1.5,
+    'comments_per_post': 2.0,
+    'replies_per_comment': 0.5,
+}
+
+
+class SummarizeTests(SimpleTestCase):
+    """Test the report of recorded requests."""
+
+    def test_percentiles(self):
+        """Test nearest-rank percentiles, errors and throughput"""
+        results = [
+            ('post-list', i, i + (i + 1) / 1000, 200) for i in range(100)
+        ]
+        results.append(('post-like', 0, 0.5, 404))
+
+        summary = loadtest.summarize(results)
+
+        post_list = summary['endpoints']['post-list']
+        self.assertEqual(post_list['p50_ms'], 50)
+        self.assertEqual(post_list['p95_ms'], 95)
+        self.assertEqual(post_list['p99_ms'], 99)
+        self.assertEqual(post_list['max_ms'], 100)
+        self.assertEqual(summary['endpoints']['post-like']['errors'], 1)
+        self.assertEqual(summary['requests'], 101)
+        self.assertEqual(summary['errors'], 1)
+        self.assertAlmostEqual(summary['elapsed_s'], 99.1)
+
+    def test_no_results(self):
+        """Test an empty run reports zeros"""
+        self.assertEqual(loadtest.summarize([])['requests'], 0)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """Test the loadtest command end to end."""
+
+    def test_loadtest(self):
+        """Test a short run against the app served in process"""
+        out = StringIO()
+
+        call_command(
+            'loadtest', clients=2, requests=15, warmup=1, stdout=out,
+            **SIZES,
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['requests'], 30)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['seeded']['tables']['posts']['rows'], 30)
+        self.assertIn('commit', report)
+        for endpoint in report['endpoints'].values():
+            self.assertLessEqual(endpoint['p50_ms'], endpoint['p99_ms'])
+        self.assertTrue(set(report['endpoints']) <= set(loadtest.SCENARIO))
@@ -0,0 +1,194 @@
+"""
+Tests for the request metrics and the /metrics endpoint
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Blog
+from blog import cache
+
+
+METRICS_URL = reverse('metrics')
+BLOG_URL = reverse('blog:blog-list')
+
+
+def detail_url(blog_id):
+    """Create and return a blog detail URL."""
+    return reverse('blog:blog-detail', args=[blog_id])
+
+
+def parse_metrics(text):
+    """Return {sample with labels: value} of a text exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+
+    return samples
+
+
+def _count_in_child(directory):
+    with override_settings(METRICS_DIR=directory):
+        metrics.inc('api_requests_total', {'route': 'child'})
+
+
+class MetricsDirMixin:
+    """Point METRICS_DIR at a fresh directory for each test."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(metrics.reset, self.directory)
+
+
+class MmapValuesTests(MetricsDirMixin, SimpleTestCase):
+    """Test the per-process values file."""
+
+    def test_values_survive_reopening(self):
+        """Test a reopened file keeps its keys and values"""
+        path = os.path.join(self.directory, 'worker.db')
+        values = metrics.MmapValues(path)
+        values.inc('a', 2)
+        values.inc('ü', 0.5)
+        values.close()
+
+        values = metrics.MmapValues(path)
+        values.inc('a')
+        values.close()
+
+        self.assertEqual(metrics.read_values(path), {'a': 3.0, 'ü': 0.5})
+
+    def test_file_grows(self):
+        """Test keys past the initial file size are kept"""
+        path = os.path.join(self.directory, 'worker.db')
+        values = metrics.MmapValues(path)
+        for i in range(5000):
+            values.inc(f'key {i}', i)
+        values.close()
+
+        read = metrics.read_values(path)
+        self.assertEqual(len(read), 5000)
+        self.assertEqual(read['key 4999'], 4999)
+
+    def test_workers_are_summed(self):
+        """Test values written by another process add up with ours"""
+        metrics.inc('api_requests_total', {'route': 'child'})
+        child = multiprocessing.get_context('fork').Process(
+            target=_count_in_child, args=(self.directory,),
+        )
+        child.start()
+        child.join()
+
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        samples = parse_metrics(metrics.render(metrics.collect()))
+        self.assertEqual(samples['api_requests_total{route="child"}'], 2)
+
+    def test_histogram_is_cumulative(self):
+        """Test buckets count every observation at or under their bound"""
+        for value in (0, 3, 4, 1000):
+            metrics.observe('api_request_queries', {'route': 'r'}, value)
+
+        samples = parse_metrics(metrics.render(metrics.collect()))
+
+        bucket = 'api_request_queries_bucket{route="r",le="%s"}'
+        self.assertEqual(samples[bucket % '0'], 1)
+        self.assertEqual(samples[bucket % '3'], 2)
+        self.assertEqual(samples[bucket % '5'], 3)
+        self.assertEqual(samples[bucket % '100'], 3)
+        self.assertEqual(samples[bucket % '+Inf'], 4)
+        self.assertEqual(samples['api_request_queries_sum{route="r"}'], 1007)
+        self.assertEqual(samples['api_request_queries_count{route="r"}'], 4)
+
+
+class MetricsEndpointTests(MetricsDirMixin, TestCase):
+    """Test the /metrics endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_route_metrics(self):
+        """Test requests, latency, queries and cache use per route"""
+        self.client.get(BLOG_URL)
+        self.client.get(BLOG_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        text = res.content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', text)
+        samples = parse_metrics(text)
+        route = 'route="blog:blog-list"'
+        self.assertEqual(samples[
+            f'api_requests_total{{method="GET",{route},status="200"}}'
+        ], 2)
+        self.assertEqual(samples[
+            f'api_request_duration_seconds_bucket{{{route},le="+Inf"}}'
+        ], 2)
+        self.assertEqual(
+            samples[f'api_request_queries_count{{{route}}}'], 2,
+        )
+        self.assertEqual(samples[f'api_cache_hits_total{{{route}}}'], 1)
+        self.assertEqual(samples[f'api_cache_misses_total{{{route}}}'], 1)
+        self.assertEqual(samples[f'api_cache_hit_ratio{{{route}}}'], 0.5)
+
+    def test_detail_cache_metrics(self):
+        """Test detail requests report cache use under their route"""
+        post = Blog.objects.create(user=self.user, title='post')
+        self.client.get(detail_url(post.id))
+        self.client.get(detail_url(post.id))
+
+        samples = parse_metrics(self.client.get(METRICS_URL).content.decode())
+
+        route = 'route="blog:blog-detail"'
+        self.assertEqual(samples[f'api_cache_hits_total{{{route}}}'], 1)
+        self.assertEqual(samples[f'api_cache_misses_total{{{route}}}'], 1)
+
+    def test_unmatched_paths_share_a_label(self):
+        """Test unknown paths do not add a label per path"""
+        self.client.get('/no-such-path/1')
+        self.client.get('/no-such-path/2')
+
+        text = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn('route="unmatched"', text)
+        self.assertFalse(re.search('no-such-path', text))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required(self):
+        """Test a configured token is asked for as a bearer token"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, 401)
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret',
+        )
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,118 @@
+"""
+Tests for the Server-Timing middleware
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Blog
+from core.timing import current
+
+
+BLOG_URL = reverse('blog:blog-list')
+ME_URL = reverse('user:me')
+
+
+def parse_server_timing(header):
+    """Return {metric: {param: value}} for a Server-Timing header."""
+    metrics = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+
+    return metrics
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    """Test sampled requests report their timings."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        Blog.objects.create(user=self.user, title='post')
+
+    def _client(self):
+        # the middleware reads its settings when the client loads it
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        """Test the header and log line hold every phase"""
+        client = self._client()
+
+        with self.assertLogs('core.middleware', 'INFO') as logs, \
+                CaptureQueriesContext(connection) as captured:
+            res = client.get(BLOG_URL)
+
+        metrics = parse_server_timing(res['Server-Timing'])
+        self.assertEqual(
+            list(metrics),
+            ['sql', 'view', 'serialize', 'render', 'total'],
+        )
+        self.assertEqual(
+            metrics['sql']['desc'], f'"{len(captured)} queries"',
+        )
+        for name in ('view', 'serialize', 'render'):
+            self.assertGreater(float(metrics[name]['dur']), 0)
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']), float(metrics['view']['dur']),
+        )
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'blog:blog-list')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], len(captured))
+        self.assertEqual(logs.records[0].timing, record)
+        self.assertIsNone(current())
+
+    def test_not_sampled_by_default(self):
+        """Test requests are left alone when sampling is off"""
+        client = self._client()
+
+        with self.assertNoLogs('core.middleware', 'INFO'):
+            res = client.get(BLOG_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(
+        SERVER_TIMING_SAMPLE_RATE=0,
+        SERVER_TIMING_ROUTES={'user:me': 1},
+    )
+    def test_per_route_rate(self):
+        """Test a route rate overrides the default rate"""
+        client = self._client()
+
+        with self.assertLogs('core.middleware', 'INFO'):
+            res = client.get(ME_URL)
+        self.assertIn('Server-Timing', res)
+
+        res = client.get(BLOG_URL)
+        self.assertNotIn('Server-Timing', res)
+
+    @override_settings(
+        SERVER_TIMING_SAMPLE_RATE=1,
+        SERVER_TIMING_ROUTES={'blog:blog-list': 0},
+    )
+    def test_route_opt_out(self):
+        """Test a route rate of 0 turns sampling off for that route"""
+        client = self._client()
+
+        res = client.get(BLOG_URL)
+        self.assertNotIn('Server-Timing', res)
+
+        with self.assertLogs('core.middleware', 'INFO'):
+            res = client.get(ME_URL)
+        self.assertIn('Server-Timing', res)
@@ -0,0 +1,89 @@
+"""
+Tests for the JSON renderer and parser
+"""
+import datetime
+import decimal
+import io
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+PAYLOAD = {
+    'id': 1,
+    'created_at': datetime.datetime(
+        2022, 10, 1, 12, 30, 15, 123456, tzinfo=timezone.utc,
+    ),
+    'day': datetime.date(2022, 10, 1),
+    'price': decimal.Decimal('1.50'),
+    'label': gettext_lazy('lazy'),
+    'key': uuid.UUID('12345678123456781234567812345678'),
+    'text': 'ünïcode line\u2028separator\u2029',
+    'tags': [{'id': 2, 'name': None}],
+    1: 'non string key',
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the orjson renderer matches DRF's JSONRenderer."""
+
+    def test_render_matches_json_renderer(self):
+        """Test the bytes match JSONRenderer for every supported type"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_indent_falls_back(self):
+        """Test pretty printed output is left to JSONRenderer"""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type),
+        )
+
+    def test_render_without_orjson(self):
+        """Test the stdlib encoder is used when orjson is missing"""
+        with patch('core.renderers.orjson', None):
+            rendered = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(rendered, JSONRenderer().render(PAYLOAD))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the orjson parser."""
+
+    def test_parse(self):
+        """Test a UTF-8 body parses like JSONParser"""
+        body = '{"title": "ünïcode", "tags": [{"name": "a"}]}'.encode()
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_parse_error(self):
+        """Test malformed bodies raise ParseError"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_parse_other_charset_falls_back(self):
+        """Test non UTF-8 bodies are decoded by JSONParser"""
+        body = '{"title": "ünïcode"}'.encode('latin-1')
+
+        data = FastJSONParser().parse(
+            io.BytesIO(body), parser_context={'encoding': 'latin-1'},
+        )
+
+        self.assertEqual(data, {'title': 'ünïcode'})
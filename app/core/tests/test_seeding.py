@@ -0,0 +1,246 @@
+"""
+Tests for the seeded datasets and the seed_blog command
+"""
+import json
+from contextlib import contextmanager
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import (
+    CommandError,
+    call_command,
+)
+from django.db import connection
+from django.db.models import (
+    Count,
+    F,
+)
+from django.test import TestCase
+
+from core.models import (
+    Blog,
+    Comment,
+    Reply,
+)
+from core.seeding import (
+    COPIED_MODELS,
+    delete_dataset,
+    seed_blog,
+)
+
+
+SIZES = {
+    'users': 10,
+    'posts': 300,
+    'tags_per_user': 5,
+    'sections_per_user': 4,
+    'tags_per_post': 2,
+    'sections_per_post': 1,
+    'likes_per_post': 3.0,
+    'comments_per_post': 2.0,
+    'replies_per_comment': 1.0,
+}
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+@contextmanager
+def other_session():
+    """Keep a second session connected to the test database."""
+    other = connection.copy()
+    other.ensure_connection()
+    try:
+        yield other
+    finally:
+        other.close()
+
+
+def foreign_keys():
+    """Return the foreign keys of the seeded tables."""
+    with connection.cursor() as cursor:
+        return {
+            (model._meta.db_table, name, tuple(constraint['columns']))
+            for model in COPIED_MODELS
+            for name, constraint in
+            connection.introspection.get_constraints(
+                cursor, model._meta.db_table,
+            ).items()
+            if constraint['foreign_key']
+        }
+
+
+class SeedBlogTests(TestCase):
+    """Test seeding a dataset."""
+
+    def test_counts(self):
+        """Test the fixed sizes and the reported rows match the tables"""
+        seeded = seed_blog('seed', **SIZES, chunk_size=7)
+
+        tables = seeded['tables']
+        self.assertEqual(tables['users']['rows'], 10)
+        self.assertEqual(tables['posts']['rows'], 300)
+        self.assertEqual(tables['tags']['rows'], 50)
+        self.assertEqual(Blog.tags.through.objects.count(), 600)
+        self.assertEqual(Blog.sections.through.objects.count(), 300)
+        self.assertEqual(
+            tables['likes']['rows'], Blog.likes.through.objects.count(),
+        )
+        self.assertEqual(tables['comments']['rows'], Comment.objects.count())
+        self.assertEqual(tables['replies']['rows'], Reply.objects.count())
+        self.assertGreater(tables['replies']['rows'], 0)
+        self.assertEqual(tables['search_vectors']['rows'], 300)
+        self.assertFalse(Blog.objects.filter(search_vector=None).exists())
+
+    def test_counters_match_rows(self):
+        """Test like_count and comment_count agree with the seeded rows"""
+        seed_blog('seed', **SIZES)
+
+        posts = Blog.objects.annotate(
+            likes_n=Count('likes', distinct=True),
+            comments_n=Count('comments', distinct=True),
+        )
+        for post in posts:
+            self.assertEqual(post.like_count, post.likes_n)
+            self.assertEqual(post.comment_count, post.comments_n)
+
+    def test_links_stay_with_owner(self):
+        """Test posts link only their owner's tags and sections"""
+        seed_blog('seed', **SIZES)
+
+        self.assertFalse(Blog.tags.through.objects.exclude(
+            tag__user=F('blog__user'),
+        ).exists())
+        self.assertFalse(Blog.sections.through.objects.exclude(
+            section__user=F('blog__user'),
+        ).exists())
+
+    def test_foreign_keys_restored(self):
+        """Test the keys dropped for the copy are back afterwards"""
+        before = foreign_keys()
+        seeded = seed_blog('seed', **SIZES)
+
+        self.assertTrue(before)
+        self.assertEqual(foreign_keys(), before)
+        self.assertIn('foreign_keys', seeded['tables'])
+
+    def test_refuses_to_drop_keys_with_other_sessions(self):
+        """Test keys are not dropped while another session is connected"""
+        before = foreign_keys()
+
+        with other_session(), self.assertRaises(ValueError):
+            seed_blog('seed', **SIZES)
+
+        self.assertEqual(foreign_keys(), before)
+        self.assertFalse(Blog.objects.exists())
+
+    def test_keep_keys_with_other_sessions(self):
+        """Test seeding with the keys in place runs next to other sessions"""
+        before = foreign_keys()
+
+        with other_session():
+            seeded = seed_blog('seed', **SIZES, drop_keys=False)
+
+        self.assertEqual(seeded['tables']['posts']['rows'], 300)
+        self.assertNotIn('foreign_keys', seeded['tables'])
+        self.assertEqual(foreign_keys(), before)
+        self.assertEqual(Blog.objects.count(), 300)
+
+    def test_activity_is_skewed(self):
+        """Test the busiest user writes far more than the mean"""
+        seed_blog('seed', **SIZES)
+
+        per_user = sorted(
+            Blog.objects.values('user').annotate(
+                n=Count('id'),
+            ).values_list('n', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(per_user[0], 2 * 300 / 10)
+
+    def test_deterministic_and_replaced(self):
+        """Test reseeding gives the same rows in place of the old ones"""
+        def snapshot():
+            return (
+                list(Blog.objects.order_by('id').values_list(
+                    'user__email', 'title', 'visible', 'like_count',
+                    'comment_count',
+                )),
+                list(Comment.objects.order_by('id').values_list(
+                    'user__email', 'post__title',
+                )),
+                list(Reply.objects.order_by('id').values_list(
+                    'user__email', 'comment__post__title',
+                )),
+            )
+
+        seed_blog('seed', **SIZES)
+        first = snapshot()
+        seed_blog('seed', **SIZES)
+
+        self.assertEqual(snapshot(), first)
+        self.assertEqual(
+            get_user_model().objects.filter(
+                email__startswith='seed-',
+            ).count(),
+            10,
+        )
+
+    def test_delete_keeps_other_users(self):
+        """Test deleting a dataset removes other users' rows on its posts"""
+        seed_blog('seed', **SIZES)
+        user = create_user(email='user@example.com', password='test123')
+        own = Blog.objects.create(user=user, title='own')
+        Comment.objects.create(user=user, post=Blog.objects.first(), body='c')
+        Comment.objects.create(user=user, post=own, body='c')
+
+        delete_dataset('seed')
+
+        self.assertEqual(list(Blog.objects.all()), [own])
+        self.assertEqual(Comment.objects.get().post, own)
+        self.assertTrue(get_user_model().objects.filter(pk=user.pk).exists())
+
+
+class SeedBlogCommandTests(TestCase):
+    """Test the seed_blog command."""
+
+    def test_report(self):
+        """Test the JSON report carries per table throughput"""
+        out = StringIO()
+
+        call_command(
+            'seed_blog', json=True, skip_search_vectors=True, stdout=out,
+            **SIZES,
+        )
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['tables']['posts']['rows'], 300)
+        self.assertNotIn('search_vectors', report['tables'])
+        self.assertGreater(report['rows'], 300)
+        self.assertGreater(report['rows_per_s'], 0)
+
+    def test_table(self):
+        """Test the default output has a line per step and a total"""
+        out = StringIO()
+
+        call_command('seed_blog', users=2, posts=5, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith('users'))
+        self.assertTrue(lines[-1].startswith('total'))
+        self.assertTrue(all('rows/s' in line for line in lines))
+
+    def test_refuses_with_other_sessions(self):
+        """Test the command errors unless told to keep the foreign keys"""
+        with other_session():
+            with self.assertRaisesMessage(CommandError, 'other session'):
+                call_command('seed_blog', users=2, posts=5, stdout=StringIO())
+
+            call_command(
+                'seed_blog', users=2, posts=5, keep_foreign_keys=True,
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(Blog.objects.count(), 5)
@@ -0,0 +1,207 @@
+"""
+Tests for the slow query log
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from core import slowlog
+from core.models import Blog
+from core.slowlog import (
+    QueryLog,
+    fingerprint,
+)
+from core.timing import TimedSerializerMixin
+
+
+BLOG_URL = reverse('blog:blog-list')
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class OwnerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'email']
+
+
+class PostOwnerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Post serializer loading each owner on its own, an N+1."""
+    user = OwnerSerializer()
+
+    class Meta:
+        model = Blog
+        fields = ['id', 'title', 'user']
+
+
+class FingerprintTests(SimpleTestCase):
+    """Test SQL fingerprints."""
+
+    def test_values_are_folded(self):
+        """Test literals and value lists do not change the fingerprint"""
+        first = fingerprint(
+            'SELECT * FROM "core_blog" WHERE "id" IN (%s, %s) '
+            "AND \"title\" = 'a' LIMIT 21"
+        )
+        second = fingerprint(
+            'SELECT *  FROM "core_blog"\nWHERE "id" IN (%s) '
+            "AND \"title\" = 'it''s' LIMIT 51"
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[0],
+            'SELECT * FROM "core_blog" WHERE "id" IN (...) '
+            'AND "title" = %s LIMIT %s',
+        )
+
+    def test_inserted_rows_are_folded(self):
+        """Test bulk inserts of any size share a fingerprint"""
+        self.assertEqual(
+            fingerprint('INSERT INTO "t" ("a", "b") VALUES (%s, %s)'),
+            fingerprint(
+                'INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'
+            ),
+        )
+
+    def test_different_queries_differ(self):
+        """Test queries on other tables or columns do not collide"""
+        self.assertNotEqual(
+            fingerprint('SELECT "a" FROM "t1"')[1],
+            fingerprint('SELECT "a" FROM "t2"')[1],
+        )
+
+
+class QueryLogTests(TestCase):
+    """Test the execute wrapper."""
+
+    def setUp(self):
+        user = create_user(email='user@example.com', password='test123')
+        self.posts = [
+            Blog.objects.create(user=user, title=f'post {i}')
+            for i in range(3)
+        ]
+
+    def test_repeated_queries_reported(self):
+        """Test a query run once per object is reported with its count"""
+        query_log = QueryLog(threshold_ms=60000, repeat_threshold=3)
+        query_log.route = 'blog:blog-list'
+
+        with connection.execute_wrapper(query_log):
+            for post in self.posts:
+                Blog.objects.get(pk=post.pk)
+            Blog.objects.count()
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            query_log.report()
+
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'repeated_query')
+        self.assertEqual(record['route'], 'blog:blog-list')
+        self.assertEqual(record['count'], 3)
+        self.assertIn('"core_blog"."id" = %s', record['sql'])
+        self.assertIn('test_repeated_queries_reported', record['stack'][-1])
+        self.assertTrue(record['stack'][-1].startswith(
+            'core/tests/test_slowlog.py:',
+        ))
+
+    def test_repeated_query_names_serializer_field(self):
+        """Test an N+1 of a nested serializer names the serializer field"""
+        query_log = QueryLog(threshold_ms=60000, repeat_threshold=3)
+        posts = Blog.objects.order_by('id')
+
+        token = slowlog.activate(query_log)
+        try:
+            with connection.execute_wrapper(query_log):
+                PostOwnerSerializer(posts, many=True).data
+        finally:
+            slowlog.deactivate(token)
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            query_log.report()
+
+        self.assertEqual(len(logs.records), 1)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['count'], 3)
+        self.assertIn('FROM "core_user"', record['sql'])
+        self.assertEqual(record['serializer'], 'PostOwnerSerializer')
+        self.assertEqual(record['field'], 'user')
+
+    def test_fields_not_tracked_without_query_log(self):
+        """Test serializers leave the field unset outside logged requests"""
+        fields = slowlog.attribute_fields(
+            PostOwnerSerializer(), iter(['field']),
+        )
+
+        self.assertEqual(list(fields), ['field'])
+        self.assertIsNone(slowlog._field.get())
+
+    def test_fast_queries_not_logged(self):
+        """Test queries under the thresholds log nothing"""
+        query_log = QueryLog(threshold_ms=60000, repeat_threshold=3)
+
+        with self.assertNoLogs('core.slowlog'), \
+                connection.execute_wrapper(query_log):
+            Blog.objects.count()
+            query_log.report()
+
+
+class SlowQueryMiddlewareTests(TestCase):
+    """Test slow queries are attributed to routes and actions."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        Blog.objects.create(user=self.user, title='post')
+
+    def _client(self):
+        # the middleware reads its settings when the client loads it
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        """Test a slow query carries the route, action and view frames"""
+        client = self._client()
+
+        with self.assertLogs('core.slowlog', 'WARNING') as logs:
+            res = client.get(BLOG_URL)
+
+        self.assertEqual(res.status_code, 200)
+        records = [json.loads(log.getMessage()) for log in logs.records]
+        self.assertTrue(records)
+        for record in records:
+            self.assertEqual(record['event'], 'slow_query')
+            self.assertEqual(record['route'], 'blog:blog-list')
+            self.assertEqual(record['action'], 'list')
+            self.assertEqual(record['repeats'], 1)
+            self.assertEqual(len(record['fingerprint']), 16)
+            self.assertIn('serializer', record)
+        stacks = [frame for record in records for frame in record['stack']]
+        self.assertTrue(any(
+            frame.startswith('blog/') for frame in stacks
+        ))
+        self.assertFalse(any(
+            'site-packages' in frame
+            or frame.startswith(('core/middleware.py', 'core/timing.py'))
+            for frame in stacks
+        ))
+
+    def test_off_by_default(self):
+        """Test nothing is logged without SLOW_QUERY_MS"""
+        client = self._client()
+
+        with self.assertNoLogs('core.slowlog'):
+            client.get(BLOG_URL)
@@ -0,0 +1,91 @@
+"""
+Per-request timing of SQL, serialization and rendering phases
+"""
+import contextvars
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from core import slowlog
+
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Durations in seconds per phase, and the queries run, of a request.
+
+    An instance is also a database execute wrapper, adding the time of
+    every query to the `sql` phase.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self._running = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['sql'] += time.perf_counter() - start
+            self.queries += 1
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+
+def current():
+    """Return the timing of the sampled request in progress, if any."""
+    return _current.get()
+
+
+def activate(timing):
+    """Make `timing` current, returning a token for deactivate()."""
+    return _current.set(timing)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to phase `name`.
+
+    Nested blocks of the same phase count once, so recursive code can
+    time itself at every level. Nothing is timed outside sampled
+    requests.
+    """
+    timing = _current.get()
+    if timing is None or name in timing._running:
+        yield
+        return
+
+    timing._running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
+        timing._running.discard(name)
+
+
+class TimedSerializerMixin:
+    """Count the serializer's to_representation in the `serialize` phase.
+
+    Queries run while rendering a field are attributed to the serializer
+    and field in the slow query log.
+    """
+
+    @property
+    def _readable_fields(self):
+        return slowlog.attribute_fields(self, super()._readable_fields)
+
+    def to_representation(self, instance):
+        if _current.get() is None:
+            return super().to_representation(instance)
+
+        with phase('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,27 @@
+"""
+Views for the service itself
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core import metrics
+
+
+@require_GET
+def metrics_view(request):
+    """Serve the metrics of every worker in Prometheus text format."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}',
+    ):
+        return HttpResponse(status=401)
+
+    totals = metrics.collect()
+    totals.update(metrics.cache_ratios(totals))
+
+    return HttpResponse(
+        metrics.render(totals),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )